@@ -3,6 +3,7 @@ import typer
 app = typer.Typer()
 
 from . import pubsub
+from . import company_data
 
 
 @app.command()
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+from typing import List
+
+import httpx
+import typer
+from google import genai
+from google.auth import default
+from google.cloud import storage
+from pymongo import AsyncMongoClient
+
+from app.foundation import get_env
+from app.foundation.server import AppConfig
+from app.foundation.server.logger import LocalLogger
+from . import app
+
+
+@app.command(
+    name="company_data_sync",
+)
+def company_data_sync(
+        sources: List[str],
+        max_items: int = 100000,
+        statuses: List[str] = typer.Option(None, help="Company statuses. Active statuses by default"),
+        concurrency: int = typer.Option(4, help="Parallel syncs per source"),
+        page_size: int = 1000,
+        force: bool = typer.Option(False, help="Sync companies even if their data is up-to-date"),
+        mongodb_uri: str = typer.Option(None, help="MongoDB to sync. MONGODB_URI by default"),
+        bucket: str = typer.Option("dvc-dataset-v2", help="Bucket for raw datasets"),
+        config: str = "config.yml",
+):
+    """
+    Sync company data sources in this process for many companies, without Pub/Sub.
+    """
+    from app.company_data.models import SyncRequest
+
+    logging.basicConfig(level=logging.INFO)
+    request = SyncRequest(sources=sources, max_items=max_items, page_size=page_size, force=force)
+    if statuses:
+        request.statuses = statuses
+    try:
+        asyncio.run(_company_data_sync(request, concurrency, mongodb_uri, bucket, config))
+    except KeyboardInterrupt:
+        print("Interrupted")
+
+
+async def _company_data_sync(request, concurrency: int, mongodb_uri: str | None, bucket: str, config_path: str):
+    from app.company_data.company_context import CompanyContextLoader
+    from app.company_data.indexes import ensure_jobs_indexes
+    from app.company_data.sources import SOURCE_FETCHERS, make_data_syncer
+    from app.company_data.worker import CompanyDataWorker
+    from app.shared import ScrapinClient, SerpApiClient, SpectrClient
+    from app.shared.dependencies import upstream_rate_limiter
+
+    config = AppConfig().load_yml(config_path)
+    logger = LocalLogger()
+    mongo_client = AsyncMongoClient(mongodb_uri or str(get_env('MONGODB_URI')), tz_aware=True)
+    database = mongo_client.get_default_database()
+    dataset_bucket = storage.Client().bucket(bucket)
+    # Unsupported sources get no syncer, the worker reports them
+    sources = [source for source in request.sources if source in SOURCE_FETCHERS]
+    if "google_jobs" in sources:
+        await ensure_jobs_indexes(database)
+    company_context = CompanyContextLoader(database)
+
+    async with httpx.AsyncClient(transport=httpx.AsyncHTTPTransport(retries=3), timeout=httpx.Timeout(60 * 5)) as http_client:
+        # Same process-wide limiters as the API dependencies, so `rate_limits` in config applies to CLI runs
+        clients = {}
+        if "linkedin" in sources:
+            clients["scrapin_client"] = ScrapinClient(
+                logger=logger,
+                http_client=http_client,
+                rate_limiter=upstream_rate_limiter(config, "scrapin", ScrapinClient.RATE_LIMIT),
+            )
+        if {"googleplay", "appstore", "google_jobs"} & set(sources):
+            clients["serpapi_client"] = SerpApiClient(
+                logger=logger,
+                http_client=http_client,
+                rate_limiter=upstream_rate_limiter(config, "serpapi", SerpApiClient.RATE_LIMIT),
+            )
+        if "spectr" in sources:
+            clients["spectr_client"] = SpectrClient(
+                logger=logger,
+                http_client=http_client,
+                dataset_bucket=dataset_bucket,
+                rate_limiter=upstream_rate_limiter(config, "spectr", SpectrClient.RATE_LIMIT),
+            )
+        if "google_jobs" in sources:
+            _, project_id = default()
+            clients["genai_client"] = genai.Client(
+                vertexai=True,
+                project=str(get_env('GOOGLE_CLOUD_PROJECT', project_id)),
+                location=str(get_env('GOOGLE_CLOUD_REGION', 'us-central1')),
+            )
+
+        syncers = {
+            source: make_data_syncer(
+                source,
+                database=database,
+                dataset_bucket=dataset_bucket,
+                logger=logger,
+                config=config,
+                company_context=company_context,
+                **clients
+            )
+            for source in sources
+        }
+        worker = CompanyDataWorker(database, syncers, logger, concurrency=concurrency, company_context=company_context)
+        try:
+            progress = await worker.run(request)
+            print(f"Synced {progress.synced}, failed {progress.failed}, up-to-date {progress.up_to_date}")
+        finally:
+            await mongo_client.close()
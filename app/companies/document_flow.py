@@ -1,7 +1,5 @@
 import os
 import pathlib
-import tempfile
-from pathlib import Path
 from typing import Dict
 
 import httpx
@@ -12,7 +10,8 @@ from pymongo.asynchronous.database import AsyncDatabase
 
 from app.companies.models import CompanyCreateRequest
 from app.companies.pdf.downloader import URLDownloader
-from app.companies.pdf.flyweight import PDFlyweight
+from app.companies.pdf.extraction_cache import ExtractionCache
+from app.companies.pdf.flyweight import PDFlyweight, extraction_version
 from app.company_data.job_dispatcher import JobDispatcher
 from app.foundation.primitives import datetime, json
 from app.foundation.server import Logger
@@ -32,6 +31,9 @@ class CompanyFromDocsFlow:
 
     PDF_BUCKET_NAME = "dvc-pdfs"
     OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
+    DEALFLOW_GRAPH = "Subgraphs #0 Main Graph"
+    # Part of the extraction cache key of the structured data, a changed graph or graph prompt needs a new version
+    DEALFLOW_GRAPH_VERSION = "main-v1"
 
     def __init__(
             self,
@@ -48,6 +50,12 @@ class CompanyFromDocsFlow:
         self.http_client = http_client
         self.job_dispatcher = job_dispatcher
         self.logger = logger
+        self.extraction_cache = ExtractionCache(
+            storage_client.bucket(self.PDF_BUCKET_NAME),
+            logger,
+            version=extraction_version(),
+            data_version=self.DEALFLOW_GRAPH_VERSION,
+        )
 
     async def __call__(self, request: CompanyCreateRequest) -> str:
         """Process documents and create company"""
@@ -63,13 +71,17 @@ class CompanyFromDocsFlow:
         try:
             # Fetch and store PDF
             pdf_bytes, gcs_path = await self._fetch_and_store_pdf(request.id, request.sources)
+            pdf_hash = ExtractionCache.content_hash(pdf_bytes)
+            log_labels["pdfHash"] = pdf_hash
 
             # Extract text from PDF and upload to bucket
-            extracted_text = await self._extract_and_upload_text_from_pdf(request.id, pdf_bytes)
+            extracted_text, text_complete = await self._extract_and_upload_text_from_pdf(request.id, pdf_bytes, pdf_hash)
             self.logger.info("Extracted text from PDF", labels=log_labels | {"textLength": len(extracted_text)})
 
-            # Extract structured data and upload to bucket
-            extracted_data = await self._extract_and_upload_data_from_pitch_text(request.id, extracted_text)
+            # Extract structured data and upload to bucket. Data of incomplete text is not cached either.
+            extracted_data = await self._extract_and_upload_data_from_pitch_text(
+                request.id, extracted_text, pdf_hash if text_complete else None
+            )
 
             # Store extracted data to company record
             key_fields, data = self._flatten_extracted_data(extracted_data)
@@ -118,11 +130,28 @@ class CompanyFromDocsFlow:
 
         return pdf_bytes, final_path
 
-    async def _extract_and_upload_data_from_pitch_text(self, company_id: str, text: str) -> Dict:
-        """Extract structured data from pitch text and upload to bucket"""
+    async def _extract_and_upload_data_from_pitch_text(self, company_id: str, text: str, pdf_hash: str = None) -> Dict:
+        """Extract structured data from pitch text and upload to bucket. Reuses the extraction of the same PDF."""
+        extracted_data = await self.extraction_cache.get_data(pdf_hash) if pdf_hash else None
+        if extracted_data is not None:
+            self.logger.info("Reused structured data of the same PDF", labels={"companyId": company_id, "pdfHash": pdf_hash})
+        else:
+            extracted_data = await self._extract_data_from_pitch_text(company_id, text)
+            if pdf_hash:
+                await self.extraction_cache.put_data(pdf_hash, extracted_data)
+
+        # Upload structured data to bucket
+        bucket = self.storage_client.bucket(self.PDF_BUCKET_NAME)
+        json_path = f"companies/{company_id}/pitch.json"
+        json_blob = bucket.blob(json_path)
+        json_blob.upload_from_string(json.dumps(extracted_data), content_type="application/json")
+
+        return extracted_data
+
+    async def _extract_data_from_pitch_text(self, company_id: str, text: str) -> Dict:
         url = "https://api.dvcagent.com/dealflow/run/main"
         data = {
-            "graph": "Subgraphs #0 Main Graph",
+            "graph": self.DEALFLOW_GRAPH,
             "openAiKey": self.OPENAI_API_KEY,
             "inputs": {
                 "input_pitch_deck": text,
@@ -135,38 +164,36 @@ class CompanyFromDocsFlow:
         timeout = httpx.Timeout(60*20)
         result = await self.http_client.post(url, headers=headers, json=data, timeout=timeout)
         result.raise_for_status()
-        extracted_data = result.json()
-
-        # Upload structured data to bucket
+        return result.json()
+
+    async def _extract_and_upload_text_from_pdf(
+            self, company_id: str, pdf_bytes: bytes, pdf_hash: str = None
+    ) -> tuple[str, bool]:
+        """
+        Uses PDFlyweight to extract text from PDF and uploads to bucket. Reuses the text of the same PDF.
+        Also tells whether OCR of every page was complete, only complete text is cached.
+        """
+        extracted_text = await self.extraction_cache.get_text(pdf_hash) if pdf_hash else None
+        complete = True
+        if extracted_text is not None:
+            self.logger.info("Reused text of the same PDF", labels={"companyId": company_id, "pdfHash": pdf_hash})
+        else:
+            # Pages are rendered in the process pool and sent to the vision model as they come, all in memory.
+            # OCR of pages seen in other decks comes from the cache.
+            pdf_processor = PDFlyweight(None, self.openai_client, self.logger, cache=self.extraction_cache)
+            extracted_text = await pdf_processor.pdf_to_text(pdf_bytes)
+            # Text with incomplete pages gets another chance with the next upload of the deck
+            complete = not pdf_processor.incomplete_pages
+            if pdf_hash and complete:
+                await self.extraction_cache.put_text(pdf_hash, extracted_text)
+
+        # Upload extracted text to bucket
         bucket = self.storage_client.bucket(self.PDF_BUCKET_NAME)
-        json_path = f"companies/{company_id}/pitch.json"
-        json_blob = bucket.blob(json_path)
-        json_blob.upload_from_string(json.dumps(extracted_data), content_type="application/json")
-
-        return extracted_data
-
-    async def _extract_and_upload_text_from_pdf(self, company_id: str, pdf_bytes: bytes) -> str:
-        """Uses PDFlyweight to extract text from PDF and uploads to bucket"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # Save PDF to temp file
-            temp_pdf_path = Path(temp_dir) / "document.pdf"
-            temp_pdf_path.write_bytes(pdf_bytes)
-
-            # Initialize PDFlyweight with working directory
-            work_dir = Path(temp_dir) / "work"
-            pdf_processor = PDFlyweight(work_dir, self.openai_client, self.logger)
-
-            # Convert PDF to pages and extract text
-            pdf_processor.to_pages(str(temp_pdf_path))
-            extracted_text = await pdf_processor.to_text()
-
-            # Upload extracted text to bucket
-            bucket = self.storage_client.bucket(self.PDF_BUCKET_NAME)
-            text_path = f"companies/{company_id}/pitch.txt"
-            text_blob = bucket.blob(text_path)
-            text_blob.upload_from_string(extracted_text, content_type="text/plain")
+        text_path = f"companies/{company_id}/pitch.txt"
+        text_blob = bucket.blob(text_path)
+        text_blob.upload_from_string(extracted_text, content_type="text/plain")
 
-            return extracted_text
+        return extracted_text, complete
 
     def _flatten_extracted_data(self, extracted_data: Dict) -> tuple[Dict, Dict]:
         """Flatten extracted data for MongoDB storage following existing schema"""
@@ -272,8 +299,12 @@ class CompanyFromDocsFlow:
         """Trigger job dispatcher updates for all supported data sources"""
         supported_sources = ["linkedin", "spectr", "googleplay", "appstore", "google_jobs"]
 
-        for source in supported_sources:
-            await self.job_dispatcher.trigger_one(company, source)
+        report = await self.job_dispatcher.trigger_batch([(company, source) for source in supported_sources])
+        self.logger.info("Dispatched data source updates", labels={
+            "company": company.model_dump_for_logs(),
+            "published": report.published,
+            "failed": report.failed,
+        })
 
     async def _update_company_error(self, company_id: str, error_msg: str):
         """Update company with processing error"""
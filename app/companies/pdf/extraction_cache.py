@@ -0,0 +1,71 @@
+import hashlib
+import json
+from typing import Any, Dict
+
+from google.api_core.exceptions import NotFound
+from google.cloud import storage
+
+from app.foundation import as_async
+from app.foundation.server import Logger
+
+__all__ = ["ExtractionCache"]
+
+
+class ExtractionCache(object):
+    """
+    Results of pitch deck extraction keyed by content hashes, stored next to company files in the PDF bucket:
+
+        cache/<version>/decks/<pdf sha256>/pitch.txt                  - text of the whole deck
+        cache/<version>/decks/<pdf sha256>/<data_version>/pitch.json  - structured extraction of that text
+        cache/<version>/pages/<page image sha256>.txt                 - vision OCR of a single page
+
+    `version` names the vision model and OCR prompt, see `flyweight.extraction_version`, and `data_version`
+    the graph extracting the structured data, so results of an older pipeline are never reused. Cache errors
+    are logged and treated as misses, extraction never fails because of the cache.
+    """
+
+    def __init__(self, bucket: storage.Bucket, logger: Logger, version: str, data_version: str, prefix: str = "cache"):
+        self._bucket = bucket
+        self._logger = logger
+        self._prefix = f"{prefix}/{version}"
+        self._data_version = data_version
+
+    @staticmethod
+    def content_hash(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    async def get_text(self, pdf_hash: str) -> str | None:
+        return await self._get(f"{self._prefix}/decks/{pdf_hash}/pitch.txt")
+
+    async def put_text(self, pdf_hash: str, text: str):
+        await self._put(f"{self._prefix}/decks/{pdf_hash}/pitch.txt", text, "text/plain")
+
+    async def get_data(self, pdf_hash: str) -> Dict[str, Any] | None:
+        # Plain json keeps the payload exactly as the extraction service returned it
+        data = await self._get(f"{self._prefix}/decks/{pdf_hash}/{self._data_version}/pitch.json")
+        return json.loads(data) if data else None
+
+    async def put_data(self, pdf_hash: str, data: Dict[str, Any]):
+        path = f"{self._prefix}/decks/{pdf_hash}/{self._data_version}/pitch.json"
+        await self._put(path, json.dumps(data), "application/json")
+
+    async def get_page(self, page_hash: str) -> str | None:
+        return await self._get(f"{self._prefix}/pages/{page_hash}.txt")
+
+    async def put_page(self, page_hash: str, text: str):
+        await self._put(f"{self._prefix}/pages/{page_hash}.txt", text, "text/plain")
+
+    async def _get(self, path: str) -> str | None:
+        try:
+            return await as_async(self._bucket.blob(path).download_as_text)
+        except NotFound:
+            return None
+        except Exception as e:
+            self._logger.warning("Failed to read extraction cache", labels={"path": path, "error": str(e)})
+            return None
+
+    async def _put(self, path: str, data: str, content_type: str):
+        try:
+            await as_async(self._bucket.blob(path).upload_from_string, data, content_type=content_type)
+        except Exception as e:
+            self._logger.warning("Failed to write extraction cache", labels={"path": path, "error": str(e)})
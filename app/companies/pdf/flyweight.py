@@ -1,35 +1,189 @@
 import base64
 import io
+import json
+import multiprocessing
+import os
 import pathlib
+import re
 import tempfile
 import time
 from argparse import ArgumentParser
 import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Tuple
 
 import fitz
 import openai
 from openai.types import chat
 from app.foundation.server import Logger
+from app.companies.pdf.extraction_cache import ExtractionCache
+from app.companies.pdf.ocr_scheduler import OcrScheduler, ocr_scheduler
 
 __all__ = ["PDFlyweight"]
 
+PAGE_SEPARATOR = "\n=======================================\n"
+# Pages rendered by one process pool task. The PDF bytes are sent to the worker once per task.
+PAGES_PER_RENDER_TASK = 4
+# Rough token cost of the OCR calls for the tokens-per-minute budget: image + prompt + completion
+VISION_CALL_TOKENS = 6000
+# Completion tokens of the first OCR attempt. Attempts cut by the limit retry with twice as many, up to the cap.
+OCR_MAX_TOKENS = 4096
+OCR_MAX_TOKENS_CAP = 16384
+# Text layer is used instead of vision when it scores at least MIN_TEXT_LAYER_COVERAGE. The score grows with the
+# text length up to MIN_TEXT_LAYER_CHARS and shrinks with the share of the page covered by images, except a background
+# image covering at least MIN_BACKGROUND_SHARE of the page with text drawn over it.
+MIN_TEXT_LAYER_CHARS = 200
+MIN_TEXT_LAYER_COVERAGE = 0.6
+MIN_BACKGROUND_SHARE = 0.8
+MAX_VECTOR_DRAWINGS = 100
+DEFAULT_VISION_MODEL = "gpt-4o"
+# Prompt ids are part of the extraction cache version, a changed prompt needs a new id
+OCR_PROMPT_ID = "extract_text_from_image_v2"
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def _render_pool() -> ProcessPoolExecutor:
+    """
+    Process-wide pool for page rendering. Spawned workers do not inherit threads of the server process.
+    """
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=max(1, min(4, os.cpu_count() or 1)),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def _page_dpi(page: fitz.Page) -> int | None:
+    page_rect = page.rect
+    area = page_rect.get_area()  # number of the pixels at the page.
+    dpi = 72  # Default DPI for the PDF.
+    if area >= 1366 * 768:
+        # Resolution is high. We keep DPI as it is
+        dpi = None
+    elif 640 * 360 < area < 1366 * 768:
+        # Resolution is medium. So we need to bump DPI.
+        # PDF is vector format - the output image will be crisp, but embedded images may be slightly blur
+        dpi = 72 * 2
+    else:
+        # Resolution is low. Use even high DPI
+        dpi = 72 * 3
+    return dpi
+
+
+def _page_count(pdf_bytes: bytes) -> int:
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        return doc.page_count
+
+
+@dataclass
+class PageContent:
+    page_num: int
+    # Text layer of the page, with tables as markdown
+    text: str
+    # 0..1, how much of the page the text layer is expected to capture
+    coverage: float
+    # Rendered page when it has to go through the vision model
+    image: bytes | None = None
+
+
+def _text_layer(page: fitz.Page) -> Tuple[str, float]:
+    """
+    Text and tables of the page with the coverage score. Pages with little text, large images or vector
+    charts score low. Text inside tables comes once, as the table markdown. A background image covering
+    most of the page with text drawn over it does not lower the score, smaller images always do.
+    """
+    tables = []
+    try:
+        tables = page.find_tables().tables
+    except Exception:
+        # Table detection is best effort, plain text already has the cell values
+        pass
+    table_rects = [fitz.Rect(table.bbox) for table in tables]
+    text_rects = []
+    texts = []
+    for x0, y0, x1, y1, block_text, _, block_type in page.get_text("blocks"):
+        if block_type != 0:
+            continue
+        rect = fitz.Rect(x0, y0, x1, y1)
+        text_rects.append(rect)
+        if not any(_overlap(rect, table_rect) >= 0.5 for table_rect in table_rects):
+            texts.append(block_text.strip())
+    for table in tables:
+        try:
+            texts.append(table.to_markdown())
+        except Exception:
+            pass
+    text = "\n\n".join(filter(None, texts))
+
+    page_area = page.rect.get_area() or 1
+    image_area = 0.0
+    for info in page.get_image_info():
+        image_rect = fitz.Rect(info["bbox"]) & page.rect
+        if image_rect.get_area() >= MIN_BACKGROUND_SHARE * page_area and any(
+                _overlap(text_rect, image_rect) >= 0.5 for text_rect in text_rects):
+            # Background behind the text, its content is in the text layer
+            continue
+        image_area += image_rect.get_area()
+    image_share = min(1.0, image_area / page_area)
+    coverage = min(1.0, len(text) / MIN_TEXT_LAYER_CHARS) * (1 - image_share)
+    if len(page.get_drawings()) > MAX_VECTOR_DRAWINGS:
+        # Charts and diagrams drawn as vectors carry meaning the text layer misses
+        coverage = min(coverage, MIN_TEXT_LAYER_COVERAGE / 2)
+    return text, coverage
+
+
+def _overlap(rect: fitz.Rect, other: fitz.Rect) -> float:
+    """Share of `rect` covered by `other`"""
+    area = rect.get_area()
+    if not area:
+        return 0.0
+    return (rect & other).get_area() / area
+
+
+def _render_pages(pdf_bytes: bytes, start: int, stop: int, fmt: str, hybrid: bool) -> List[PageContent]:
+    """
+    Runs in the process pool. With `hybrid` only pages with a poor text layer are rendered.
+    """
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        pages = []
+        for index in range(start, stop):
+            page = doc.load_page(index)
+            text, coverage = _text_layer(page) if hybrid else ("", 0.0)
+            content = PageContent(page_num=index + 1, text=text, coverage=coverage)
+            if not hybrid or coverage < MIN_TEXT_LAYER_COVERAGE:
+                pix: fitz.Pixmap = page.get_pixmap(dpi=_page_dpi(page))
+                content.image = pix.tobytes(fmt)
+            pages.append(content)
+        return pages
+
 
 class PDFlyweight:
     def __init__(
         self, 
-        working_dir: Path | str, 
+        working_dir: Path | str | None, 
         openai_client: openai.AsyncOpenAI,
         logger: Logger,
-        vision_model="gpt-4o", 
-        text_model="gpt-4o"
+        vision_model=DEFAULT_VISION_MODEL,
+        scheduler: OcrScheduler = None,
+        cache: ExtractionCache = None,
     ):
         self._working_dir = None
-        self._text_model = text_model
         self._vision_model = vision_model
         self._openai_client = openai_client
         self._logger = logger
-        self.set_work_dir(working_dir)
+        self._scheduler = scheduler or ocr_scheduler()
+        self._cache = cache
+        # Pages whose best OCR attempt was still incomplete. Text with such pages is not worth caching.
+        self.incomplete_pages = 0
+        # Pages of one PDFlyweight take turns with pages of other decks
+        self._deck_id = id(self)
+        if working_dir is not None:
+            self.set_work_dir(working_dir)
 
     def set_work_dir(self, working_dir) -> "PDFlyweight":
         self._working_dir: Path = working_dir if isinstance(working_dir, Path) else Path(str(working_dir))
@@ -47,78 +201,136 @@ class PDFlyweight:
         doc = fitz.open(input_path)
 
         for num, page in enumerate(doc.pages()):
-            page_rect = page.rect
-            area = page_rect.get_area()  # number of the pixels at the page.
-            dpi = 72  # Default DPI for the PDF.
-            if area >= 1366 * 768:
-                # Resolution is high. We keep DPI as it is
-                dpi = None
-            elif 640 * 360 < area < 1366 * 768:
-                # Resolution is medium. So we need to bump DPI.
-                # PDF is vector format - the output image will be crisp, but embedded images may be slightly blur
-                dpi = 72 * 2
-            else:
-                # Resolution is low. Use even high DPI
-                dpi = 72 * 3
-
-            pix: fitz.Pixmap = page.get_pixmap(dpi=dpi)
+            pix: fitz.Pixmap = page.get_pixmap(dpi=_page_dpi(page))
             pix.save(self._working_dir / f"page_{num + 1:03d}.{fmt}")
 
+    async def render_pages(self, pdf_bytes: bytes, fmt="png", hybrid=True) -> AsyncIterator[PageContent]:
+        """
+        Extract pages in the process pool and yield them as soon as each chunk of pages is ready. Nothing touches
+        the filesystem and the event loop stays free. With `hybrid` only pages with a poor text layer get an image.
+        """
+        loop = asyncio.get_running_loop()
+        pool = _render_pool()
+        page_count = await loop.run_in_executor(pool, _page_count, pdf_bytes)
+        futures = [
+            loop.run_in_executor(
+                pool, _render_pages, pdf_bytes, start, min(start + PAGES_PER_RENDER_TASK, page_count), fmt, hybrid
+            )
+            for start in range(0, page_count, PAGES_PER_RENDER_TASK)
+        ]
+        try:
+            for future in asyncio.as_completed(futures):
+                for page in await future:
+                    yield page
+        finally:
+            for future in futures:
+                future.cancel()
+
+    async def pdf_to_text(self, pdf_bytes: bytes, fmt="png", hybrid=True) -> str:
+        """
+        Pipeline version of `to_pages` + `to_text`: every page goes to the vision model as soon as it is rendered.
+        With `hybrid` pages with a good text layer skip the vision model.
+        """
+        tasks: Dict[int, asyncio.Future] = {}
+        try:
+            async for page in self.render_pages(pdf_bytes, fmt, hybrid):
+                if page.image is None:
+                    future = asyncio.get_running_loop().create_future()
+                    future.set_result(_format_page(page.page_num, page.text))
+                    tasks[page.page_num] = future
+                else:
+                    tasks[page.page_num] = asyncio.create_task(self.cached_page_to_text(page.page_num, page.image, fmt))
+            results = await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            raise
+        vision_pages = sum(1 for task in tasks.values() if isinstance(task, asyncio.Task))
+        self._logger.info("Extracted text from PDF pages", labels={
+            "pages": len(tasks),
+            "visionPages": vision_pages,
+            "textLayerPages": len(tasks) - vision_pages,
+        })
+        pages = sorted(zip(tasks.keys(), results))
+        return PAGE_SEPARATOR.join(text for _, text in pages)
+
     async def image_to_text(self, input_image: io.BytesIO, fmt="png") -> str:
         """
-        Convert image as a byte array to string with GPT vision and confirmation from the GPT4-Turbo
+        Convert image as a byte array to markdown with GPT vision. The model reports in the same structured response
+        whether it captured everything, incomplete attempts are retried and the best one is kept.
+        """
+        text, _ = await self._ocr(input_image, fmt)
+        return text
+
+    async def _ocr(self, input_image: bytes, fmt="png") -> Tuple[str, bool]:
+        """
+        `image_to_text` which also tells whether the returned markdown is complete
         """
         base64_image = base64.b64encode(input_image).decode("utf-8")
         messages = [
-            {"role": "system", "content": self._get_prompt("extract_text_from_image")},
+            {"role": "system", "content": self._get_prompt(OCR_PROMPT_ID)},
             {
                 "role": "user",
                 "content": [{"type": "image_url", "image_url": {"url": f"data:image/{fmt};base64,{base64_image}"}}],
             },
         ]
-        contents = []
+        attempts: List[Tuple[float, str]] = []
+        max_tokens = OCR_MAX_TOKENS
         for attempt in range(1, 6):
-            response: chat.ChatCompletion | None = None
-            try:
-                response = await self._openai_client.chat.completions.create(
+            # Calls share the process-wide OCR capacity fairly with other decks. The scheduler retries rate limited
+            # calls, its RateLimitError means the page failed.
+            response: chat.ChatCompletion = await self._scheduler.call(
+                self._deck_id,
+                tokens=VISION_CALL_TOKENS + max_tokens - OCR_MAX_TOKENS,
+                fn=lambda: self._openai_client.chat.completions.create(
                     model=self._vision_model,
                     messages=messages,
                     temperature=0,
-                    max_tokens=4096,
-                )
-            except openai.RateLimitError as e:
-                self._logger.warning("OpenAI rate limit exceeded", labels={"attempt": attempt, "error": str(e)})
-                await asyncio.sleep(1)
-                continue  # Skip the rest of the loop and move to the next image
-            content_response = response.choices[0].message.content
-            contents.append(content_response)
-            response = await self._openai_client.chat.completions.create(
-                model=self._text_model,
-                messages=[
-                    {"role": "system", "content": self._get_prompt("verify_extracted_text")},
-                    {"role": "user", "content": content_response},
-                ],
-                temperature=0,
-                max_tokens=4096,
+                    max_tokens=max_tokens,
+                    response_format=OCR_RESPONSE_FORMAT,
+                ),
             )
-            judgement = response.choices[0].message.content
-            if judgement in {"0", "Response 0"}:
-                # Successful response sometime is '0', sometime is "Response 0"
-                return content_response
-        return max(contents)
+            choice = response.choices[0]
+            result = _parse_ocr_response(choice.message.content)
+            if result["complete"] and choice.finish_reason == "stop":
+                return result["markdown"], True
+            attempts.append((_ocr_quality(result, choice.finish_reason), result["markdown"]))
+            self._logger.info("Incomplete page OCR", labels={
+                "attempt": attempt,
+                "finishReason": choice.finish_reason,
+                "maxTokens": max_tokens,
+                "missing": result["missing"],
+            })
+            if choice.finish_reason == "length":
+                # Dense slide, the answer did not fit
+                max_tokens = min(max_tokens * 2, OCR_MAX_TOKENS_CAP)
+        self.incomplete_pages += 1
+        return max(attempts)[1], False
+
+    async def cached_page_to_text(self, page_num: int, image: bytes, fmt="png") -> str:
+        """
+        `page_to_text` reusing OCR of identical page images from the extraction cache. Only complete OCR is cached.
+        """
+        if self._cache is None:
+            return await self.page_to_text(page_num, image, fmt)
+        page_hash = self._cache.content_hash(image)
+        text = await self._cache.get_page(page_hash)
+        if text is None:
+            text, complete = await self._ocr(image, fmt)
+            if complete:
+                await self._cache.put_page(page_hash, text)
+        return _format_page(page_num, text)
+
+    async def page_to_text(self, page_num: int, image: bytes, fmt="png") -> str:
+        text = await self.image_to_text(image, fmt)
+        return _format_page(page_num, text)
 
     async def file_path_to_text(self, file_path: pathlib.Path):
         try:
             name, fmt = file_path.name.split(".")
             page, page_num = name.split("_")
             page_num = int(page_num)
-            text = await self.image_to_text(file_path.read_bytes(), fmt)
-            return "\n\n".join(
-                [
-                    f"Source: pitch_deck/page={page_num}",
-                    text,
-                ]
-            )
+            return await self.page_to_text(page_num, file_path.read_bytes(), fmt)
         except ValueError as e:
             self._logger.error("Unexpected file name for image", labels={"filePath": str(file_path), "error": str(e)})
             raise e
@@ -128,14 +340,112 @@ class PDFlyweight:
 
         tasks = [self.file_path_to_text(path) for path in images if path.name.startswith("page")]
         results = await asyncio.gather(*tasks)
-        return "\n=======================================\n".join(results)
+        return PAGE_SEPARATOR.join(results)
 
     def _get_prompt(self, prompt_id):
         return prompts.get(prompt_id)
 
 
+OCR_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "page_ocr",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "markdown": {"type": "string"},
+                "complete": {"type": "boolean"},
+                "missing": {"type": "string"},
+            },
+            "required": ["markdown", "complete", "missing"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+# Phrases of answers where the model declines to transcribe the slide
+_REFUSAL_MARKERS = ("i'm sorry", "i am sorry", "i can't", "i cannot", "unable to", "can't assist")
+
+
+# Start of the markdown value in the structured answer and the longest valid JSON string body after it
+_MARKDOWN_VALUE_START = re.compile(r'"markdown"\s*:\s*"')
+_JSON_STRING_BODY = re.compile(r'(?:\\u[0-9a-fA-F]{4}|\\[^u]|[^"\\])*')
+
+
+def _parse_ocr_response(content: str | None) -> Dict[str, Any]:
+    content = content or ""
+    try:
+        result = json.loads(content)
+        return {
+            "markdown": str(result.get("markdown") or ""),
+            "complete": bool(result.get("complete")),
+            "missing": str(result.get("missing") or ""),
+        }
+    except (ValueError, AttributeError):
+        pass
+    markdown = _partial_markdown(content)
+    if markdown is not None:
+        # Answer cut by max_tokens, keep the markdown written so far
+        return {"markdown": markdown, "complete": False, "missing": "truncated response"}
+    if content.lstrip().startswith(("{", "[")):
+        # Broken JSON without markdown is never passed on as page text
+        return {"markdown": "", "complete": False, "missing": "unparsable response"}
+    # Not a structured answer, keep the text as an incomplete attempt
+    return {"markdown": content, "complete": False, "missing": "unstructured response"}
+
+
+def _partial_markdown(content: str) -> str | None:
+    """
+    Markdown value of a truncated structured answer, up to the last complete character
+    """
+    start = _MARKDOWN_VALUE_START.search(content)
+    if not start:
+        return None
+    body = _JSON_STRING_BODY.match(content, start.end()).group(0)
+    try:
+        return json.loads(f'"{body}"')
+    except ValueError:
+        return None
+
+
+def _ocr_quality(result: Dict[str, Any], finish_reason: str | None) -> float:
+    """
+    Rank incomplete attempts: self-reported completeness first, then the amount of extracted content,
+    with refusals and truncated answers pushed down.
+    """
+    markdown = result["markdown"]
+    head = markdown[:300].lower()
+    score = min(len(markdown.strip()), 4000) / 4000
+    if result["complete"]:
+        score += 1
+    if not result["missing"]:
+        score += 0.5
+    if any(marker in head for marker in _REFUSAL_MARKERS):
+        score -= 2
+    if finish_reason == "length":
+        score -= 0.5
+    return score
+
+
+def extraction_version(vision_model: str = DEFAULT_VISION_MODEL) -> str:
+    """
+    Version of the extracted text for the extraction cache. Text of another model or OCR prompt is not reused.
+    """
+    return f"{vision_model}-{OCR_PROMPT_ID}"
+
+
+def _format_page(page_num: int, text: str) -> str:
+    return "\n\n".join(
+        [
+            f"Source: pitch_deck/page={page_num}",
+            text,
+        ]
+    )
+
+
 prompts = {
-    "extract_text_from_image": """
+    OCR_PROMPT_ID: """
 Goal: extract text from the slide presentation in detail, ensuring no loss of meaning.
 Requirements:
  * highlight and write the title and subtitle of the slide if they exist. Maintain pagination as in the original.
@@ -144,12 +454,10 @@ Requirements:
  * Ignore background images.
  * Ignore watermarks and "CONFIDENTIAL" ones on the slides.
  * Write tables from input in markdown format
-""",
-    "verify_extracted_text": """
-Your goal is to control the quality of another machine learning mode. That model converts images to text.
-Occasionally, the model does not recognize or refuse to provide details from the image.
-Find the text where the model explicitly refuses to provide details from the original image.
-Response "0" if everything was recognized otherwise return what was missed.
+Respond with:
+ * markdown: the extracted content.
+ * complete: false if you could not recognize or refused to provide any detail of the slide, otherwise true.
+ * missing: what was not captured, empty if complete.
 """,
 }
 
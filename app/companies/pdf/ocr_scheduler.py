@@ -0,0 +1,151 @@
+import asyncio
+import random
+import typing
+from collections import deque
+
+import openai
+
+from app.foundation import pattern
+from app.foundation.server import AppConfig
+
+__all__ = ["OcrScheduler", "ocr_scheduler"]
+
+T = typing.TypeVar("T")
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_TOKENS_PER_MINUTE = 400_000
+MAX_ATTEMPTS = 6
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+
+
+class OcrScheduler(object):
+    """
+    Shares OpenAI capacity between the decks processed by the process.
+
+    Calls get a slot out of `concurrency` in round-robin order across decks, so a long deck does not stall
+    the others, and then take their estimated tokens from a tokens-per-minute bucket. Only one picked call
+    waits for tokens at a time, the next deck is picked once it has them, so the bucket is shared round-robin
+    too and at most one slot sits idle waiting for budget. Rate limited calls are retried with jittered
+    exponential backoff, honouring retry-after, and pause the bucket for everyone. This is the only rate limit
+    retry, callers should not retry on top of it.
+
+    Example:
+        text = await ocr_scheduler().call(deck_id, tokens=3000, fn=lambda: client.chat.completions.create(...))
+    """
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY, tokens_per_minute: int = DEFAULT_TOKENS_PER_MINUTE):
+        self._concurrency = max(1, concurrency)
+        self._active = 0
+        # deck id -> waiters of the deck, decks in the order they get the next slot
+        self._waiters: typing.Dict[typing.Hashable, typing.Deque[asyncio.Future]] = {}
+        self._decks: typing.Deque[typing.Hashable] = deque()
+        # A picked call is waiting for tokens, the next pick waits for it
+        self._budget_turn = False
+        self._budget = pattern.RateLimiter("ocr", rate=tokens_per_minute / 60, capacity=tokens_per_minute)
+
+    async def call(
+            self,
+            deck_id: typing.Hashable,
+            tokens: int,
+            fn: typing.Callable[[], typing.Awaitable[T]],
+            max_attempts: int = MAX_ATTEMPTS,
+    ) -> T:
+        """
+        Run `fn` in a slot of the deck. Re-raises `openai.RateLimitError` after `max_attempts`.
+        """
+        for attempt in range(1, max_attempts + 1):
+            await self._acquire(deck_id, tokens)
+            try:
+                return await fn()
+            except openai.RateLimitError as e:
+                if attempt == max_attempts:
+                    raise
+                delay = backoff_delay(attempt, _retry_after(e))
+                self._budget.pause(delay)
+            finally:
+                self._release()
+            await asyncio.sleep(delay)
+
+    async def _acquire(self, deck_id: typing.Hashable, tokens: int):
+        waiter = asyncio.get_running_loop().create_future()
+        if deck_id not in self._waiters:
+            self._waiters[deck_id] = deque()
+            self._decks.append(deck_id)
+        self._waiters[deck_id].append(waiter)
+        self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot and the budget turn were granted right before the cancellation
+                self._budget_turn = False
+                self._release()
+            raise
+        try:
+            await self._budget.acquire(tokens)
+        except BaseException:
+            self._budget_turn = False
+            self._release()
+            raise
+        self._budget_turn = False
+        self._dispatch()
+
+    def _release(self):
+        self._active -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        while not self._budget_turn and self._active < self._concurrency and self._decks:
+            deck_id = self._decks.popleft()
+            waiters = self._waiters[deck_id]
+            waiter = waiters.popleft()
+            if waiters:
+                # The deck goes to the end of the line
+                self._decks.append(deck_id)
+            else:
+                del self._waiters[deck_id]
+            if waiter.done():
+                continue
+            self._active += 1
+            self._budget_turn = True
+            waiter.set_result(None)
+
+
+def backoff_delay(attempt: int, retry_after: float | None = None) -> float:
+    """
+    Seconds to wait before `attempt + 1`. Full jitter over the exponential step, never less than retry-after.
+    """
+    delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+    if retry_after is not None:
+        delay = retry_after + random.uniform(0, BACKOFF_BASE)
+    return delay
+
+
+def _retry_after(error: openai.RateLimitError) -> float | None:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        return None
+    return None
+
+
+_scheduler: OcrScheduler | None = None
+
+
+def ocr_scheduler() -> OcrScheduler:
+    """
+    Process-wide scheduler configured by the `ocr` section of the config
+    """
+    global _scheduler
+    if _scheduler is None:
+        config = AppConfig().get("ocr") or {}
+        _scheduler = OcrScheduler(
+            concurrency=int(config.get("concurrency", DEFAULT_CONCURRENCY)),
+            tokens_per_minute=int(config.get("tokens_per_minute", DEFAULT_TOKENS_PER_MINUTE)),
+        )
+    return _scheduler
@@ -10,31 +10,32 @@ from app.shared import Company, SerpApiClient
 from app.foundation.primitives import datetime
 from app.foundation.server import Logger
 from .data_syncer import DataFetcher, FetchResult
+from .company_context import CompanyContextLoader
 
 
 __all__ = ["AppleAppStoreFetcher"]
 
 
 class AppleAppStoreFetcher(DataFetcher):
+    UPDATED_AT_FIELD = "appStoreUpdatedAt"
+    UPDATE_INTERVAL = datetime.timedelta(days=3)
+
     def __init__(
             self,
             database: AsyncDatabase,
             serpapi_client: SerpApiClient,
-            logger: Logger
+            logger: Logger,
+            company_context: CompanyContextLoader = None,
     ):
         self._database = database
         self._companies_collection = database["companies"]
         self._serpapi_client = serpapi_client
         self._logger = logger
+        self._company_context = company_context or CompanyContextLoader(database)
 
     def source_id(self) -> str:
         return "appstore"
 
-    def should_update(self, company: Company):
-        return company.appStoreUpdatedAt is None or (
-            company.appStoreUpdatedAt < datetime.now() - datetime.timedelta(days=3)
-        )
-
     async def fetch_company_data(self, company: Company) -> FetchResult:
         product_id = await self._get_app_store_product_id(company.id)
         
@@ -68,7 +69,7 @@ class AppleAppStoreFetcher(DataFetcher):
         )
 
     async def _get_app_store_product_id(self, company_id: str) -> str:
-        company = await self._companies_collection.find_one({"_id": ObjectId(company_id)})
+        company = await self._company_context.get(company_id)
         if not company or company.get("spectrUpdatedAt") is None:
             raise HTTPStatusError(
                 "Spectr data required for App Store processing",
@@ -106,6 +107,7 @@ class AppleAppStoreFetcher(DataFetcher):
                         {"_id": ObjectId(company_id)},
                         {"$set": {"appStoreId": product_id}}
                     )
+                    self._company_context.update(company_id, {"appStoreId": product_id})
                     return product_id
         
         return ""
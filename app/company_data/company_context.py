@@ -0,0 +1,58 @@
+import asyncio
+from typing import Dict, Any
+
+from bson import ObjectId
+from pymongo.asynchronous.database import AsyncDatabase
+
+__all__ = ["CompanyContextLoader"]
+
+# Parts of the company document fetchers look at besides the Pub/Sub message
+CONTEXT_PROJECTION = {
+    "name": 1,
+    "spectrUpdatedAt": 1,
+    "spectrData.socials": 1,
+    "linkedInId": 1,
+    "linkedInData.linkedInUrl": 1,
+    "googlePlayId": 1,
+    "appStoreId": 1,
+}
+
+
+class CompanyContextLoader(object):
+    """
+    Reads the company context once per company and shares it between fetchers of the same sync.
+    The large data blobs stay in Mongo, only `spectrData.socials` and the ids are projected.
+    """
+
+    def __init__(self, database: AsyncDatabase, projection: Dict[str, int] = None):
+        self._companies_collection = database["companies"]
+        self._projection = projection or CONTEXT_PROJECTION
+        self._loaded: Dict[str, asyncio.Future] = {}
+
+    async def get(self, company_id: str) -> Dict[str, Any] | None:
+        future = self._loaded.get(company_id)
+        if future is None:
+            future = self._loaded[company_id] = asyncio.ensure_future(
+                self._companies_collection.find_one({"_id": ObjectId(company_id)}, projection=self._projection)
+            )
+        try:
+            return await asyncio.shield(future)
+        except Exception:
+            self._loaded.pop(company_id, None)
+            raise
+
+    def evict(self, company_id: str):
+        """
+        Forget the company once every fetcher of the sync is done with it
+        """
+        self._loaded.pop(company_id, None)
+
+    def update(self, company_id: str, fields: Dict[str, Any]):
+        """
+        Keep the memoized context in line with fields the fetcher wrote back to Mongo
+        """
+        future = self._loaded.get(company_id)
+        if future is None or not future.done() or future.cancelled() or future.exception() is not None:
+            return
+        if future.result() is not None:
+            future.result().update(fields)
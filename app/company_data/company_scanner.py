@@ -0,0 +1,116 @@
+import hashlib
+from typing import AsyncIterator, Dict, List, Any
+
+from bson import ObjectId
+from pymongo.asynchronous.database import AsyncDatabase
+
+from app.foundation.primitives import datetime
+from app.foundation.server import Logger
+
+__all__ = ["CompanyScanner", "ScanCheckpoint", "SCAN_FIELDS"]
+
+# Fields the company data consumers read from the Pub/Sub message. Everything else stays in Mongo.
+SCAN_FIELDS = [
+    "_id", "name", "website", "domain", "status", "airtableId", "blurb",
+    "linkedInId", "spectrId", "googlePlayId", "appStoreId",
+    "linkedInUpdatedAt", "spectrUpdatedAt", "googlePlayUpdatedAt", "appStoreUpdatedAt", "googleJobsUpdatedAt",
+]
+
+DEFAULT_PAGE_SIZE = 1000
+
+# Unfinished checkpoints older than this are considered abandoned and the scan starts over
+CHECKPOINT_TTL = datetime.timedelta(hours=12)
+
+
+class ScanCheckpoint(object):
+    """
+    Persists the last processed `_id` of a scan so an interrupted run continues where it stopped.
+    """
+
+    def __init__(self, database: AsyncDatabase, key: str):
+        self._collection = database["scan_checkpoints"]
+        self.key = key
+        self.last_id: ObjectId | None = None
+        self.count = 0
+
+    @staticmethod
+    def make_key(name: str, **params) -> str:
+        parts = [name] + [f"{k}={sorted(map(str, v)) if isinstance(v, (list, set, tuple)) else v}" for k, v in sorted(params.items())]
+        return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+
+    async def load(self) -> bool:
+        """
+        Restore an unfinished checkpoint. Returns True if the scan is resumed.
+        """
+        doc = await self._collection.find_one({
+            "_id": self.key,
+            "completedAt": None,
+            "updatedAt": {"$gte": datetime.now() - CHECKPOINT_TTL},
+        })
+        if not doc:
+            return False
+        self.last_id = doc.get("lastId")
+        self.count = doc.get("count") or 0
+        return self.last_id is not None
+
+    async def save(self, last_id: ObjectId, count: int):
+        self.last_id = last_id
+        self.count = count
+        now = datetime.now()
+        await self._collection.update_one(
+            {"_id": self.key},
+            {
+                "$set": {"lastId": last_id, "count": count, "updatedAt": now, "completedAt": None},
+                "$setOnInsert": {"startedAt": now},
+            },
+            upsert=True,
+        )
+
+    async def complete(self):
+        now = datetime.now()
+        await self._collection.update_one(
+            {"_id": self.key},
+            {"$set": {"completedAt": now, "updatedAt": now, "count": self.count}},
+            upsert=True,
+        )
+
+
+class CompanyScanner(object):
+    """
+    Keyset-paginated scan over the companies collection ordered by `_id` with a narrow projection.
+    """
+
+    def __init__(
+            self,
+            database: AsyncDatabase,
+            logger: Logger,
+            page_size: int = DEFAULT_PAGE_SIZE,
+            fields: List[str] = None,
+    ):
+        self._companies_collection = database["companies"]
+        self._logger = logger
+        self._page_size = max(1, page_size)
+        self._projection = {f: 1 for f in (fields or SCAN_FIELDS)}
+
+    async def pages(
+            self,
+            query: Dict[str, Any],
+            max_items: int,
+            after_id: ObjectId | None = None,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        scanned = 0
+        while scanned < max_items:
+            page_query = {**query, "_id": {"$gt": after_id}} if after_id is not None else query
+            limit = min(self._page_size, max_items - scanned)
+            cursor = self._companies_collection.find(
+                page_query,
+                projection=self._projection,
+            ).sort("_id", 1).limit(limit)
+            page = await cursor.to_list(length=limit)
+            if not page:
+                return
+            scanned += len(page)
+            after_id = page[-1]["_id"]
+            yield page
+            if len(page) < limit:
+                return
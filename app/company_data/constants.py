@@ -1,6 +1,6 @@
 from app.shared.company import CompanyStatus
 
-__all__ = ["ACTIVE_COMPANY_STATUSES"]
+__all__ = ["ACTIVE_COMPANY_STATUSES", "IN_AIRTABLE"]
 
 ACTIVE_COMPANY_STATUSES = [
     CompanyStatus.INVESTED,
@@ -13,4 +13,7 @@ ACTIVE_COMPANY_STATUSES = [
     CompanyStatus.CHECKIN,
     CompanyStatus.DOCS_SENT,
     CompanyStatus.RADAR
-]
\ No newline at end of file
+]
+
+# Companies still present in Airtable. A full Airtable pull marks deleted records with `airtableMissingAt`.
+IN_AIRTABLE = {"airtableMissingAt": None}
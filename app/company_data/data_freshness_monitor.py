@@ -1,47 +1,102 @@
-from typing import Dict, Any
+import asyncio
+import time
+from typing import Dict, Any, Tuple
+
 from pymongo.asynchronous.database import AsyncDatabase
 from app.foundation.primitives import datetime
 from app.foundation.server.logger import Logger
-from .constants import ACTIVE_COMPANY_STATUSES
+from .constants import ACTIVE_COMPANY_STATUSES, IN_AIRTABLE
+from .sources import SOURCE_FETCHERS
 
 
 __all__ = ["DataFreshnessMonitor"]
 
+# Seconds a generated report is served from memory. Uptime checkers poll the endpoint every few seconds.
+REPORT_CACHE_TTL = 60
+
+# Upper bounds, in days, of the lag histogram buckets. Older data falls into the last, open-ended bucket.
+LAG_BUCKETS = [1, 2, 3, 7, 14, 32, 60, 90, 180, 365]
+LAG_PERCENTILES = [0.5, 0.9, 0.99]
+
+# (database name, report name) -> (monotonic time of generation, report)
+_report_cache: Dict[Tuple[str, str], Tuple[float, Dict[str, Any]]] = {}
+_report_lock = asyncio.Lock()
+
 
 class DataFreshnessMonitor:
 
-    def __init__(self, database: AsyncDatabase, logger: Logger):
+    def __init__(self, database: AsyncDatabase, logger: Logger, cache_ttl: float = REPORT_CACHE_TTL):
         self.database = database
         self.logger = logger
         self.companies_collection = database.companies
+        self.cache_ttl = cache_ttl
+
+    @staticmethod
+    def data_sources() -> Dict[str, datetime.timedelta]:
+        """Company field with the last sync time -> freshness threshold, for every registered fetcher"""
+        return {
+            fetcher.UPDATED_AT_FIELD: fetcher.FRESHNESS_THRESHOLD
+            for fetcher in SOURCE_FETCHERS.values()
+            if fetcher.UPDATED_AT_FIELD
+        }
 
     async def check_data_freshness(self) -> Dict[str, Any]:
-        """Check data freshness for all active companies"""
-        data_sources = [
-            ("spectrUpdatedAt", 32),
-            ("linkedinUpdatedAt", 10),
-            ("googlePlayUpdatedAt", 10),
-            ("googleJobsUpdatedAt", 10),
-            ("appStoreUpdatedAt", 10)
-        ]
+        """Check data freshness for all active companies. Reports are cached for `cache_ttl` seconds."""
+        return await self._cached("freshness", self._generate_report)
+
+    async def check_lag_distribution(self) -> Dict[str, Any]:
+        """Lag percentiles and histogram of every data source across active companies. Cached like the freshness report."""
+        return await self._cached("lag", self._generate_lag_report)
+
+    async def _cached(self, name: str, generate) -> Dict[str, Any]:
+        key = (self.database.name, name)
+        async with _report_lock:
+            cached = _report_cache.get(key)
+            if cached and time.monotonic() - cached[0] < self.cache_ttl:
+                return cached[1]
+            report = await generate()
+            _report_cache[key] = (time.monotonic(), report)
+            return report
+
+    async def _generate_report(self) -> Dict[str, Any]:
+        data_sources = self.data_sources()
 
-        # Get total count of active companies
-        total_active_companies = await self.companies_collection.count_documents({
-            "status": {"$in": ACTIVE_COMPANY_STATUSES}
-        })
+        now = datetime.now()
+        group = {"_id": None, "total": {"$sum": 1}}
+        for field_name, threshold in data_sources.items():
+            value = {"$ifNull": [f"${field_name}", None]}
+            is_fresh = {"$gte": [value, now - threshold]}
+            is_missing = {"$eq": [value, None]}
+            group[f"{field_name}_fresh"] = {"$sum": {"$cond": [is_fresh, 1, 0]}}
+            group[f"{field_name}_missing"] = {"$sum": {"$cond": [is_missing, 1, 0]}}
+
+        # One pass over active companies, touching only the sync time fields
+        pipeline = [
+            {"$match": {"status": {"$in": ACTIVE_COMPANY_STATUSES}, **IN_AIRTABLE}},
+            {"$project": {field_name: 1 for field_name in data_sources}},
+            {"$group": group},
+        ]
+        cursor = await self.companies_collection.aggregate(pipeline)
+        rows = await cursor.to_list(length=1)
+        counts = rows[0] if rows else {}
+        total_active_companies = counts.get("total", 0)
 
         report = {
             "activeCompaniesCount": total_active_companies,
-            "generatedAt": datetime.now(),
+            "generatedAt": now,
             "isHealthy": True
         }
 
-        # Check each data source
-        for field_name, days_threshold in data_sources:
-            stats = await self._check_source_freshness(field_name, days_threshold)
+        for field_name in data_sources:
+            fresh = counts.get(f"{field_name}_fresh", 0)
+            missing = counts.get(f"{field_name}_missing", 0)
+            stats = {
+                "fresh": fresh,
+                "stale": total_active_companies - fresh - missing,
+                "missing": missing,
+            }
             # Convert field name to report key (e.g., "spectrUpdatedAt" -> "spectrData")
-            report_key = field_name.replace("UpdatedAt", "Data")
-            report[report_key] = stats
+            report[field_name.replace("UpdatedAt", "Data")] = stats
 
             # Check if this data source has issues
             if stats["stale"] > 0 or stats["missing"] > 0:
@@ -55,31 +110,83 @@ class DataFreshnessMonitor:
 
         return report
 
-    async def _check_source_freshness(self, field_name: str, days_threshold: int) -> Dict[str, Any]:
-        """Check freshness for a specific data source"""
-        now = datetime.now()
-        threshold = now - datetime.timedelta(days=days_threshold)
+    async def _generate_lag_report(self) -> Dict[str, Any]:
+        data_sources = self.data_sources()
 
-        # Count fresh (updated within threshold)
-        fresh_count = await self.companies_collection.count_documents({
-            "status": {"$in": ACTIVE_COMPANY_STATUSES},
-            field_name: {"$gte": threshold}
-        })
+        now = datetime.now()
+        # Lag in days per source, null when the source never synced. Future timestamps count as zero lag.
+        lag_fields = {
+            field_name: {"$cond": [
+                {"$eq": [{"$ifNull": [f"${field_name}", None]}, None]},
+                None,
+                {"$max": [0, {"$divide": [
+                    {"$dateDiff": {"startDate": f"${field_name}", "endDate": now, "unit": "minute"}},
+                    24 * 60,
+                ]}]},
+            ]}
+            for field_name in data_sources
+        }
+        facets = {"total": [{"$count": "count"}]}
+        for field_name in data_sources:
+            facets[field_name] = [
+                {"$match": {field_name: {"$ne": None}}},
+                {"$group": {
+                    "_id": None,
+                    "count": {"$sum": 1},
+                    "percentiles": {"$percentile": {"input": f"${field_name}", "p": LAG_PERCENTILES, "method": "approximate"}},
+                    "max": {"$max": f"${field_name}"},
+                }},
+            ]
+            facets[f"{field_name}_histogram"] = [
+                {"$match": {field_name: {"$ne": None}}},
+                {"$bucket": {
+                    "groupBy": f"${field_name}",
+                    "boundaries": [0] + LAG_BUCKETS,
+                    "default": LAG_BUCKETS[-1],
+                    "output": {"count": {"$sum": 1}},
+                }},
+            ]
+
+        pipeline = [
+            {"$match": {"status": {"$in": ACTIVE_COMPANY_STATUSES}, **IN_AIRTABLE}},
+            {"$project": {"_id": 0, **lag_fields}},
+            {"$facet": facets},
+        ]
+        cursor = await self.companies_collection.aggregate(pipeline)
+        rows = await cursor.to_list(length=1)
+        result = rows[0] if rows else {}
+        total = result.get("total") or [{}]
+        total_active_companies = total[0].get("count", 0)
 
-        # Count stale (updated but outside threshold)
-        stale_count = await self.companies_collection.count_documents({
-            "status": {"$in": ACTIVE_COMPANY_STATUSES},
-            field_name: {"$lt": threshold}
+        report = {
+            "activeCompaniesCount": total_active_companies,
+            "generatedAt": now,
+            "percentiles": LAG_PERCENTILES,
+        }
+        for field_name, threshold in data_sources.items():
+            stats = (result.get(field_name) or [{}])[0]
+            percentiles = stats.get("percentiles") or [None] * len(LAG_PERCENTILES)
+            # Buckets are keyed by their lower bound, the open-ended one by the last boundary
+            counts = {bucket["_id"]: bucket["count"] for bucket in result.get(f"{field_name}_histogram") or []}
+            histogram = [
+                {"fromDays": lower, "toDays": upper, "count": counts.get(lower, 0)}
+                for lower, upper in zip([0] + LAG_BUCKETS, LAG_BUCKETS + [None])
+            ]
+            report[field_name.replace("UpdatedAt", "Data")] = {
+                "thresholdDays": threshold.total_seconds() / 86400,
+                "count": stats.get("count", 0),
+                "missing": total_active_companies - stats.get("count", 0),
+                **{f"p{round(p * 100)}": _round(value) for p, value in zip(LAG_PERCENTILES, percentiles)},
+                "max": _round(stats.get("max")),
+                "histogram": histogram,
+            }
+
+        self.logger.info("Generated data lag report", labels={
+            "activeCompaniesCount": total_active_companies,
+            "dataSources": len(data_sources),
         })
+        return report
 
-        # Count missing (never updated)
-        missing_count = await self.companies_collection.count_documents({
-            "status": {"$in": ACTIVE_COMPANY_STATUSES},
-            field_name: None
-        })
 
-        return {
-            "fresh": fresh_count,
-            "stale": stale_count,
-            "missing": missing_count
-        }
\ No newline at end of file
+def _round(value: float | None) -> float | None:
+    return round(value, 2) if value is not None else None
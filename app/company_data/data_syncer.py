@@ -1,7 +1,8 @@
 import gzip
+import hashlib
 from abc import ABCMeta, abstractmethod
 from dataclasses import dataclass, field
-from typing import Dict
+from typing import ClassVar, Dict
 
 from bson import ObjectId
 from google.cloud import storage
@@ -18,10 +19,20 @@ class FetchResult:
     remote_id: str = None
     raw_data: Dict = field(default_factory=dict)
     db_update_fields: Dict = field(default_factory=dict)
+    # Fields to remove from the company document, in `$unset` form
+    db_unset_fields: Dict = field(default_factory=dict)
     updated_at: datetime.datetime = field(default_factory=datetime.now)
+    # Fetch counters (pages, credits, ...) reported to the sync log
+    stats: Dict = field(default_factory=dict)
 
 
 class DataFetcher(metaclass=ABCMeta):
+    # Company field with the time of the last sync and how long the synced data stays fresh.
+    # Fetchers without them are always updated.
+    UPDATED_AT_FIELD: ClassVar[str | None] = None
+    UPDATE_INTERVAL: ClassVar[datetime.timedelta | None] = None
+    # Data older than this is reported as stale by the freshness monitor
+    FRESHNESS_THRESHOLD: ClassVar[datetime.timedelta] = datetime.timedelta(days=10)
 
     @abstractmethod
     def source_id(self) -> str:
@@ -30,8 +41,38 @@ class DataFetcher(metaclass=ABCMeta):
         """
         pass
 
+    @classmethod
+    def stale_before(cls, now: datetime.datetime) -> datetime.datetime | None:
+        """
+        Data synced before the returned time point is stale. None means data never gets fresh.
+        """
+        if cls.UPDATE_INTERVAL is None:
+            return None
+        return now - cls.UPDATE_INTERVAL
+
+    @classmethod
+    def is_stale(cls, company: Company, now: datetime.datetime) -> bool:
+        threshold = cls.stale_before(now)
+        if not cls.UPDATED_AT_FIELD or threshold is None:
+            return True
+        updated_at = getattr(company, cls.UPDATED_AT_FIELD, None)
+        return updated_at is None or updated_at < threshold
+
+    @classmethod
+    def stale_filter(cls, now: datetime.datetime) -> Dict:
+        """
+        Mongo predicate matching the same companies as `is_stale`. Empty dict matches everything.
+        """
+        threshold = cls.stale_before(now)
+        if not cls.UPDATED_AT_FIELD or threshold is None:
+            return {}
+        return {"$or": [
+            {cls.UPDATED_AT_FIELD: None},
+            {cls.UPDATED_AT_FIELD: {"$lt": threshold}},
+        ]}
+
     def should_update(self, company: Company):
-        return True
+        return self.is_stale(company, datetime.now())
 
     @abstractmethod
     async def fetch_company_data(self, company: Company) -> FetchResult | None:
@@ -54,6 +95,7 @@ class DataSyncer:
         self._data_fetcher = data_fetcher
         self._logger = logger
         self._companies_collection = database["companies"]
+        self._snapshots_collection = database["dataset_snapshots"]
 
     async def sync_one(self, company: Company):
         source_id = self._data_fetcher.source_id()
@@ -79,6 +121,7 @@ class DataSyncer:
                 "company": company.model_dump_for_logs(),
                 "source": source_id,
                 "updated_at": result.updated_at,
+                "stats": result.stats,
             })
         else:
             # Fetcher may return empty data. Example company as not an app in Apple store
@@ -89,13 +132,29 @@ class DataSyncer:
 
     async def store_raw_data(self, company: Company, result: FetchResult):
         source_id = self._data_fetcher.source_id()
+        now = datetime.now()
+        # Keys are sorted, so equal payloads produce equal hashes
+        canonical_data = json.dumps(result.raw_data, compact=True)
+        content_hash = hashlib.sha256(canonical_data.encode('utf-8')).hexdigest()
+        snapshot_id = '/'.join([source_id, company.website_id()])
+        if isinstance(result.raw_data, dict):
+            result.raw_data['fetchedAt'] = now
+
+        snapshot = await self._snapshots_collection.find_one({'_id': snapshot_id}, projection={'hash': 1, 'path': 1})
+        if snapshot and snapshot.get('hash') == content_hash:
+            await self._snapshots_collection.update_one({'_id': snapshot_id}, {'$set': {'checkedAt': now}})
+            self._logger.info("Raw data is unchanged", labels={
+                "company": company.model_dump_for_logs(),
+                "source": source_id,
+                "path": snapshot.get('path'),
+            })
+            return
+
         bucket_path = '/'.join([
-            source_id,
-            company.website_id(),
+            snapshot_id,
             f"{result.updated_at:%Y-%m-%d}.json.gz"
         ])
-        result.raw_data['fetchedAt'] = datetime.now()
-        data = json.dumps(result.raw_data)
+        data = json.dumps(result.raw_data, compact=True)
         compressed_data = gzip.compress(data.encode('utf-8'))
         blob = self._dataset_bucket.blob(bucket_path)
 
@@ -105,6 +164,11 @@ class DataSyncer:
             data=compressed_data,
             content_type='application/json',
         )
+        await self._snapshots_collection.update_one(
+            {'_id': snapshot_id},
+            {'$set': {'hash': content_hash, 'path': bucket_path, 'uploadedAt': now, 'checkedAt': now}},
+            upsert=True,
+        )
 
     async def store_db_data(self, company: Company, result: FetchResult):
         if not company.id:
@@ -118,7 +182,8 @@ class DataSyncer:
                 '_id': ObjectId(company.id)
             },
             {
-                "$set": result.db_update_fields
+                "$set": result.db_update_fields,
+                **({"$unset": result.db_unset_fields} if result.db_unset_fields else {}),
             },
         )
 
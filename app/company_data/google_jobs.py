@@ -1,11 +1,13 @@
+import asyncio
+import hashlib
 import json
-import bson
-from typing import Dict
+from typing import Dict, List
 from urllib.parse import urlparse
 
 from bson import ObjectId
 from google import genai
 from google.genai import types as genai_types
+from pymongo import UpdateOne
 from pymongo.asynchronous.database import AsyncDatabase
 
 from app.foundation import as_async
@@ -36,11 +38,39 @@ Consider:
 Response format: {{"is_match": boolean}}
 """
 
+JOBS_BATCH_VALIDATION_PROMPT = """
+You are analyzing whether job postings match a specific company based on the job descriptions and company information.
+
+Company Name: {company_name}
+Company Description: {company_blurb}
+
+Job postings:
+{postings}
+
+Task: For every posting determine if it is actually for the target company ({company_name}) or if it's for a different company with a similar name.
+
+Consider:
+- Does the job description align with the company's business/industry?
+- Are there conflicting details that suggest this is a different company?
+- Does the job company name match or could be a reasonable variation?
+
+Response format: [{{"index": integer, "is_match": boolean}}] with one item per posting
+"""
+
+JOB_POSTING_TEMPLATE = """Posting #{index}
+Job Company Name: {job_company_name}
+Job Description: {job_description}"""
+
+JOB_VALIDATION_MODEL = "gemini-2.5-flash"
+
+
 class GoogleJobsDataSyncer(DataSyncer):
     async def store_db_data(self, company: Company, result: FetchResult):
-        update_result = await self._companies_collection.update_one(
+        synced_at = datetime.now()
+        company_id = ObjectId(company.id)
+        await self._companies_collection.update_one(
             {
-                '_id': ObjectId(company.id)
+                '_id': company_id
             },
             {
                 "$set": {
@@ -50,21 +80,18 @@ class GoogleJobsDataSyncer(DataSyncer):
         )
         googleJobsData = result.db_update_fields.get("googleJobsData") or []
         jobs_collection = self._database["jobs"]
-        for job in googleJobsData:
-            result = await jobs_collection.update_one(
+        operations = [
+            UpdateOne(
                 filter={
-                    '$or': [
-                        {'companyId': company.id},
-                        {'companyId': bson.ObjectId(company.id)}
-                    ],
+                    'companyId': company_id,
                     'title': job.get('title'),
                     'location': job.get('location')
                 },
                 update={
                     '$set': {
-                        'updatedAt': datetime.now(),
+                        'updatedAt': synced_at,
                         'applyOptions': job.get('apply_options'),
-                        'companyId': bson.ObjectId(company.id),
+                        'companyId': company_id,
                         'companyName': company.name,
                         'description': job.get('description'),
                         'extensions': job.get('extensions'),
@@ -74,35 +101,60 @@ class GoogleJobsDataSyncer(DataSyncer):
                         'via': job.get('via'),
                     },
                     '$setOnInsert': {
-                        'createdAt': datetime.now(),
+                        'createdAt': synced_at,
                     }
                 },
                 upsert=True,
             )
+            for job in googleJobsData
+        ]
+        if operations:
+            await jobs_collection.bulk_write(operations, ordered=False)
+
+        # Postings which were not returned by this sync are gone. A partial search or validation proves nothing,
+        # and neither does an empty result, which is what a failed or throttled search looks like
+        deleted_count = 0
+        if result.stats.get('complete') and operations:
+            delete_result = await jobs_collection.delete_many({
+                'companyId': company_id,
+                'updatedAt': {'$lt': synced_at},
+            })
+            deleted_count = delete_result.deleted_count
+        self._logger.info("Stored Google Jobs", labels={
+            "company": company.model_dump_for_logs(),
+            "upsertedCount": len(operations),
+            "deletedCount": deleted_count,
+            "complete": bool(result.stats.get('complete')),
+        })
 
 
 class GoogleJobsFetcher(DataFetcher):
+    UPDATED_AT_FIELD = "googleJobsUpdatedAt"
+    UPDATE_INTERVAL = datetime.timedelta(days=3)
+
     def __init__(
             self,
             database: AsyncDatabase,
             serpapi_client: SerpApiClient,
             logger: Logger,
-            genai_client: genai.Client = None
+            genai_client: genai.Client = None,
+            validation_concurrency: int = 8,
+            validation_batch_size: int = 5,
+            max_pages: int | None = 5,
     ):
         self._database = database
         self._companies_collection = database["companies"]
+        self._verdicts_collection = database["job_verdicts"]
         self._serpapi_client = serpapi_client
         self._logger = logger
         self._genai_client: genai.Client = genai_client
+        self._validation_semaphore = asyncio.Semaphore(max(1, validation_concurrency))
+        self._validation_batch_size = max(1, validation_batch_size)
+        self._max_pages = max_pages
 
     def source_id(self) -> str:
         return "google-jobs"
 
-    def should_update(self, company: Company):
-        return company.googleJobsUpdatedAt is None or (
-            company.googleJobsUpdatedAt < datetime.now() - datetime.timedelta(days=3)
-        )
-
     async def is_description_matches(self, company: Company, job: Dict) -> bool:
         company_blurb = company.blurb
         job_description = job.get('description', '')
@@ -126,7 +178,7 @@ class GoogleJobsFetcher(DataFetcher):
         }
 
         response = await as_async(self._genai_client.models.generate_content,
-            model="gemini-2.5-flash",
+            model=JOB_VALIDATION_MODEL,
             contents=prompt,
             config=genai_types.GenerateContentConfig(
                 response_mime_type="application/json",
@@ -137,20 +189,150 @@ class GoogleJobsFetcher(DataFetcher):
         parsed = json.loads(response.text)
         return parsed.get('is_match', False)
 
+    async def are_descriptions_matching(self, company: Company, jobs: List[Dict]) -> List[bool | None]:
+        """
+        Judge several postings in one LLM call. Postings missing from the response get None.
+        """
+        postings = '\n\n'.join(
+            JOB_POSTING_TEMPLATE.format(
+                index=index,
+                job_company_name=job.get('company_name', ''),
+                job_description=job.get('description', ''),
+            )
+            for index, job in enumerate(jobs)
+        )
+        prompt = JOBS_BATCH_VALIDATION_PROMPT.format(
+            company_name=company.name,
+            company_blurb=company.blurb,
+            postings=postings,
+        )
+        response_schema = {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "index": {"type": "INTEGER", "nullable": False},
+                    "is_match": {"type": "BOOLEAN", "nullable": False},
+                },
+                "required": ["index", "is_match"],
+            },
+        }
+
+        response = await as_async(self._genai_client.models.generate_content,
+            model=JOB_VALIDATION_MODEL,
+            contents=prompt,
+            config=genai_types.GenerateContentConfig(
+                response_mime_type="application/json",
+                response_schema=response_schema,
+            )
+        )
+
+        verdicts: List[bool | None] = [None] * len(jobs)
+        for item in json.loads(response.text) or []:
+            index = item.get('index')
+            if isinstance(index, int) and 0 <= index < len(jobs):
+                verdicts[index] = bool(item.get('is_match', False))
+        return verdicts
+
+    async def validate_jobs(self, company: Company, jobs: List[Dict]) -> List[bool | None]:
+        """
+        LLM verdicts for the postings. Verdicts are cached per company, description and model,
+        so unchanged postings are judged once. Postings which could not be judged get None.
+        """
+        verdicts: List[bool | None] = [None] * len(jobs)
+        keys = [_verdict_key(company, job) for job in jobs]
+        for index, job in enumerate(jobs):
+            if not (job.get('description') or '').strip():
+                verdicts[index] = False
+
+        cached = {}
+        async for doc in self._verdicts_collection.find({'_id': {'$in': list(set(keys))}}):
+            cached[doc['_id']] = doc.get('isMatch', False)
+
+        pending = []
+        for index, key in enumerate(keys):
+            if verdicts[index] is not None:
+                continue
+            if key in cached:
+                verdicts[index] = cached[key]
+            else:
+                pending.append(index)
+
+        llm_calls = 0
+
+        async def _judge(indexes: List[int]) -> List[bool | None]:
+            nonlocal llm_calls
+            llm_calls += 1
+            try:
+                async with self._validation_semaphore:
+                    if len(indexes) == 1:
+                        return [await self.is_description_matches(company, jobs[indexes[0]])]
+                    return await self.are_descriptions_matching(company, [jobs[i] for i in indexes])
+            except Exception as e:
+                self._logger.error("Job validation failed", exc_info=e, labels={
+                    "company": company.model_dump_for_logs(),
+                    "jobsCount": len(indexes),
+                })
+                return [None] * len(indexes)
+
+        async def _judge_chunk(indexes: List[int]) -> List[bool | None]:
+            chunk_verdicts = await _judge(indexes)
+            if len(indexes) == 1:
+                return chunk_verdicts
+            # Postings the batch call skipped or failed on are judged one by one
+            missing = [i for i, verdict in enumerate(chunk_verdicts) if verdict is None]
+            retried = await asyncio.gather(*[_judge([indexes[i]]) for i in missing])
+            for i, (verdict,) in zip(missing, retried):
+                chunk_verdicts[i] = verdict
+            return chunk_verdicts
+
+        chunks = [pending[i:i + self._validation_batch_size] for i in range(0, len(pending), self._validation_batch_size)]
+        results = await asyncio.gather(*[_judge_chunk(chunk) for chunk in chunks])
+
+        operations = []
+        now = datetime.now()
+        for chunk, chunk_verdicts in zip(chunks, results):
+            for index, verdict in zip(chunk, chunk_verdicts):
+                verdicts[index] = verdict
+                if verdict is None:
+                    # Not cached, so it is judged next time
+                    continue
+                operations.append(UpdateOne(
+                    {'_id': keys[index]},
+                    {'$set': {'isMatch': verdict, 'companyId': ObjectId(company.id), 'model': JOB_VALIDATION_MODEL, 'createdAt': now}},
+                    upsert=True,
+                ))
+        if operations:
+            await self._verdicts_collection.bulk_write(operations, ordered=False)
+
+        self._logger.info("Validated jobs", labels={
+            "company": company.model_dump_for_logs(),
+            "jobsCount": len(jobs),
+            "cachedCount": len(jobs) - len(pending),
+            "unjudgedCount": verdicts.count(None),
+            "llmCalls": llm_calls,
+        })
+        return verdicts
+
     async def fetch_company_data(self, company: Company) -> FetchResult:
         website = f"https://{company.website}" if not company.website.startswith('http') else company.website
         domain = urlparse(website).netloc.replace('www.', '') if website else None
-        raw_data = await self._serpapi_client.search_google_jobs(domain)
+        company_name_set = _name_tokens(company.name)
+
+        def _name_matches(job: Dict) -> bool:
+            return len(company_name_set.intersection(_name_tokens(job.get('company_name', '')))) > 0
+
+        raw_data = await self._serpapi_client.search_google_jobs(
+            domain,
+            max_pages=self._max_pages,
+            page_filter=lambda jobs: [job for job in jobs if _name_matches(job)],
+        )
         search_metadata = raw_data.get('search_metadata') or {}
         jobs_results = raw_data.get('jobs_results') or []
 
-        company_name_set = set(company.name.lower().replace('.', ' ').replace(',', ' ').split()) - STOP_WORDS
-        
-        async def _is_job_valid(job: Dict):
-            job_company_name_set = set(job.get('company_name', '').lower().replace('.', ' ').replace(',', ' ').split()) - STOP_WORDS
-            basic_name_match = len(company_name_set.intersection(job_company_name_set)) > 0
-            
-            if not basic_name_match:
+        candidates = []
+        for job in jobs_results:
+            if not _name_matches(job):
                 self._logger.info(
                     "Job does not contain company name",
                     labels={
@@ -158,17 +340,25 @@ class GoogleJobsFetcher(DataFetcher):
                         "job": {k: v for k,v in job.items() if k in {'title', 'location', 'company_name'}}
                     }
                 )
-                return False
-            if not company.blurb:
-                self._logger.info(
-                    "Job filtered since company has no blurb",
-                    labels={
-                        "company": company.model_dump_for_logs(),
-                    }
-                )
-                return False
-            llm_validation = await self.is_description_matches(company, job)
-            if not llm_validation:
+                continue
+            candidates.append(job)
+
+        if candidates and not company.blurb:
+            self._logger.info(
+                "Job filtered since company has no blurb",
+                labels={
+                    "company": company.model_dump_for_logs(),
+                }
+            )
+            candidates = []
+
+        filtered_jobs = []
+        verdicts = await self.validate_jobs(company, candidates) if candidates else []
+        for job, is_valid in zip(candidates, verdicts):
+            if is_valid is None:
+                # Unknown postings are neither stored nor removed
+                continue
+            if not is_valid:
                 self._logger.info(
                     "Job filtered by LLM validation",
                     labels={
@@ -176,22 +366,29 @@ class GoogleJobsFetcher(DataFetcher):
                         "job": {k: v for k,v in job.items() if k in {'title', 'location', 'company_name'}}
                     }
                 )
-                return False
-                
-            return True
-            
-        filtered_jobs = []
-        for job in jobs_results:
-            if await _is_job_valid(job):
-                filtered_jobs.append(job)
+                continue
+            filtered_jobs.append(job)
         jobs_results = filtered_jobs
 
+        search_stats = raw_data.get('search_stats') or {}
         return FetchResult(
             raw_data=raw_data,
             remote_id=None,
+            # Empty list still goes to the syncer so the sync time is recorded
             db_update_fields={
                 "googleJobsData": jobs_results,
                 "googleJobsUpdatedAt": datetime.now()
-            } if jobs_results else {},
-            updated_at=datetime.now()
+            } if raw_data else {},
+            updated_at=datetime.now(),
+            # Only a complete search and validation lets the syncer remove postings which disappeared
+            stats=search_stats | {"complete": bool(search_stats.get('complete')) and None not in verdicts},
         )
+
+
+def _name_tokens(name: str) -> set:
+    return set(name.lower().replace('.', ' ').replace(',', ' ').split()) - STOP_WORDS
+
+
+def _verdict_key(company: Company, job: Dict) -> str:
+    description_hash = hashlib.sha256((job.get('description') or '').encode('utf-8')).hexdigest()
+    return ':'.join([str(company.id), description_hash, JOB_VALIDATION_MODEL])
@@ -2,7 +2,6 @@ from typing import Dict
 from urllib.parse import urlparse
 from http import HTTPStatus
 
-from bson import ObjectId
 from httpx import HTTPStatusError, Response
 from pymongo.asynchronous.database import AsyncDatabase
 
@@ -10,32 +9,32 @@ from app.shared import Company, SerpApiClient
 from app.foundation.primitives import datetime
 from app.foundation.server import Logger
 from .data_syncer import DataFetcher, FetchResult
+from .company_context import CompanyContextLoader
 
 
 __all__ = ["GooglePlayFetcher"]
 
 
 class GooglePlayFetcher(DataFetcher):
+    UPDATED_AT_FIELD = "googlePlayUpdatedAt"
+    UPDATE_INTERVAL = datetime.timedelta(days=3)
+
     def __init__(
             self,
             database: AsyncDatabase,
             serpapi_client: SerpApiClient,
-            logger: Logger
+            logger: Logger,
+            company_context: CompanyContextLoader = None,
     ):
         self._database = database
         self._companies_collection = database["companies"]
         self._serpapi_client = serpapi_client
         self._logger = logger
+        self._company_context = company_context or CompanyContextLoader(database)
 
     def source_id(self) -> str:
         return "googleplay"
 
-    def should_update(self, company: Company):
-        # Only check for updates if company has Google Play data or hasn't been checked yet
-        return company.googlePlayUpdatedAt is None or (
-            company.googlePlayUpdatedAt < datetime.now() - datetime.timedelta(days=3)
-        )
-
     async def fetch_company_data(self, company: Company) -> FetchResult:
         developer_id = await self._get_developer_id_from_db(company.id)
         
@@ -68,7 +67,7 @@ class GooglePlayFetcher(DataFetcher):
 
 
     async def _get_developer_id_from_db(self, company_id: str) -> str:
-        company = await self._companies_collection.find_one({"_id": ObjectId(company_id)})
+        company = await self._company_context.get(company_id)
         if not company or company.get("spectrUpdatedAt") is None:
             raise HTTPStatusError(
                 "Spectr data required for Google Play processing",
@@ -0,0 +1,48 @@
+from typing import Iterable, Set, Tuple
+
+from pymongo import ASCENDING
+from pymongo.asynchronous.database import AsyncDatabase
+
+__all__ = ["ensure_jobs_indexes", "ensure_freshness_indexes"]
+
+# (database, index group) pairs already ensured by this process
+_ensured: Set[Tuple[str, str]] = set()
+
+
+async def ensure_jobs_indexes(database: AsyncDatabase):
+    """
+    Normalize legacy string `companyId` values to ObjectId and create the index used by Google Jobs upserts.
+    Runs once per process, at server or CLI startup. Values which are not valid ObjectIds are left as they are.
+    """
+    key = (database.name, "jobs")
+    if key in _ensured:
+        return
+    jobs_collection = database["jobs"]
+    await jobs_collection.update_many(
+        {"companyId": {"$type": "string"}},
+        [{"$set": {"companyId": {
+            "$convert": {"input": "$companyId", "to": "objectId", "onError": "$companyId"},
+        }}}],
+    )
+    await jobs_collection.create_index(
+        [("companyId", ASCENDING), ("title", ASCENDING), ("location", ASCENDING)],
+        name="companyId_title_location",
+    )
+    _ensured.add(key)
+
+
+async def ensure_freshness_indexes(database: AsyncDatabase, fields: Iterable[str]):
+    """
+    Create `(status, <field>)` indexes on companies for the freshness report. Runs once per process, at server startup.
+    """
+    fields = sorted(fields)
+    key = (database.name, "freshness:" + ",".join(fields))
+    if key in _ensured:
+        return
+    companies_collection = database["companies"]
+    for field in fields:
+        await companies_collection.create_index(
+            [("status", ASCENDING), (field, ASCENDING)],
+            name=f"status_{field}",
+        )
+    _ensured.add(key)
@@ -1,13 +1,38 @@
-from typing import List, AnyStr as Str
+import asyncio
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple, AnyStr as Str
 
 from google.cloud import pubsub
+from google.cloud.pubsub_v1.publisher import futures
 from pymongo.asynchronous.database import AsyncDatabase
 
+from app.foundation.primitives import datetime
 from app.foundation.server import Logger
 from app.shared import Company, CompanyStatus
+from .company_scanner import CompanyScanner, ScanCheckpoint, DEFAULT_PAGE_SIZE
+from .constants import IN_AIRTABLE
+from .sources import SOURCE_FETCHERS, stale_filter
 from infrastructure.queues import company_data
 
-__all__ = ["JobDispatcher"]
+__all__ = ["JobDispatcher", "DispatchReport"]
+
+
+@dataclass
+class DispatchReport:
+    published: Dict[str, int] = field(default_factory=dict)
+    failed: Dict[str, int] = field(default_factory=dict)
+    up_to_date: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def total(self) -> int:
+        return sum(self.published.values())
+
+    def add(self, source: Str, ok: bool):
+        counter = self.published if ok else self.failed
+        counter[source] = counter.get(source, 0) + 1
+
+    def add_up_to_date(self, source: Str):
+        self.up_to_date[source] = self.up_to_date.get(source, 0) + 1
 
 
 class JobDispatcher(object):
@@ -33,13 +58,22 @@ class JobDispatcher(object):
     def is_supported(self, source: Str) -> bool:
         return source in self._source_to_topic_mapping
 
-    async def trigger_many(self, max_items: int, sources: List[Str], statuses: List[Str] | None = None) -> int:
+    async def trigger_many(
+            self,
+            max_items: int,
+            sources: List[Str],
+            statuses: List[Str] | None = None,
+            page_size: int = DEFAULT_PAGE_SIZE,
+            resume: bool = True,
+            force: bool = False,
+    ) -> DispatchReport:
+        report = DispatchReport()
         supported_sources = [source for source in sources if self.is_supported(source)]
         if not supported_sources:
             self._logger.warning("No supported sources", labels={
                 "sources": sources,
             })
-            return 0
+            return report
         if len(supported_sources) != len(sources):
             self._logger.warning("Some sources are not supported", labels={
                 "sources": sources,
@@ -47,38 +81,83 @@ class JobDispatcher(object):
             })
             sources = supported_sources
 
-        companies_collection = self._database["companies"]
-        projection = {f: 0 for f in Company.DATA_FIELDS}
+        now = datetime.now()
         query = {'status': {'$in': [str(status) for status in statuses]}} if statuses else {'status': str(CompanyStatus.INVESTED)}
-        cursor = companies_collection.find(query, projection=projection).limit(max_items)
-        count = 0
-        async for company_data in cursor:
-            try:
-                company = Company.model_validate(company_data)
-                if not company.has_valid_website():
-                    self._logger.info("Company has no valid website", labels={
-                        "company": company.model_dump_for_logs(),
+        query |= IN_AIRTABLE
+        if not force:
+            query |= stale_filter(sources, now)
+        checkpoint = ScanCheckpoint(
+            self._database,
+            ScanCheckpoint.make_key("trigger_many", sources=sources, statuses=query['status'], max_items=max_items, force=force)
+        )
+        if resume and await checkpoint.load():
+            self._logger.info("Resume company data pull", labels={
+                "sources": sources,
+                "lastId": str(checkpoint.last_id),
+                "scanned": checkpoint.count,
+            })
+
+        scanner = CompanyScanner(self._database, self._logger, page_size=page_size)
+        scanned = checkpoint.count
+        async for page in scanner.pages(query, max_items=max_items - scanned, after_id=checkpoint.last_id):
+            jobs = []
+            for company_data in page:
+                try:
+                    company = Company.model_validate(company_data)
+                    if not company.has_valid_website():
+                        self._logger.info("Company has no valid website", labels={
+                            "company": company.model_dump_for_logs(),
+                            "sources": sources,
+                        })
+                        continue
+
+                    for source in supported_sources:
+                        if not force and not SOURCE_FETCHERS[source].is_stale(company, now):
+                            report.add_up_to_date(source)
+                            continue
+                        jobs.append((company, source))
+                except Exception as e:
+                    self._logger.error("Failed to dispatch company data pull", exc_info=e, labels={
+                        "company": {
+                            "id": str(company_data.get("_id")),
+                            "airtableId": company_data.get("airtableId"),
+                            "name": company_data.get("name"),
+                            "website": company_data.get("website"),
+                            "status": company_data.get("status"),
+                        },
+                        "exception": str(e),
                         "sources": sources,
                     })
                     continue
 
-                for source in supported_sources:
-                    await self.trigger_one(company, source)
-                    count += 1
-            except Exception as e:
-                self._logger.error("Failed to dispatch company data pull", exc_info=e, labels={
-                    "company": {
-                        "id": str(company_data.get("_id")),
-                        "airtableId": company_data.get("airtableId"),
-                        "name": company_data.get("name"),
-                        "website": company_data.get("website"),
-                        "status": company_data.get("status"),
-                    },
-                    "exception": str(e),
-                    "sources": sources,
-                })
-                continue
-        return count
+            await self.trigger_batch(jobs, report)
+            scanned += len(page)
+            await checkpoint.save(page[-1]["_id"], scanned)
+
+        await checkpoint.complete()
+        self._logger.info("Dispatched company data pull", labels={
+            "sources": sources,
+            "scanned": scanned,
+            "published": report.published,
+            "failed": report.failed,
+            "upToDate": report.up_to_date,
+        })
+        return report
+
+    async def trigger_batch(self, jobs: List[Tuple[Company, Str]], report: DispatchReport = None) -> DispatchReport:
+        """
+        Publish every (company, source) pair at once and wait for all publish futures together.
+        Unsupported sources are skipped, outcomes are added to `report`.
+        """
+        if report is None:
+            report = DispatchReport()
+        pending = [
+            (company, source, self._publish(company, source))
+            for company, source in jobs
+            if self.is_supported(source)
+        ]
+        await self._wait_published(pending, report)
+        return report
 
     async def trigger_one(self, company: Company, source: Str):
         if not self.is_supported(source):
@@ -87,16 +166,39 @@ class JobDispatcher(object):
                 "source": source,
             })
             return
-        
+
         topic_path = self._source_to_topic_mapping[source]
-        data = company.model_dump_json().encode('utf-8')
-        
-        future = self._publisher_client.publish(topic_path, data)
-        message_id = future.result()
-        
+        message_id = await asyncio.wrap_future(self._publish(company, source))
+
         self._logger.info("Dispatch company data pull", labels={
             "company": company.model_dump_for_logs(),
             "source": source,
             "messageId": str(message_id),
             "topic": topic_path,
         })
+
+    def _publish(self, company: Company, source: Str) -> futures.Future:
+        """
+        Hand the message to the publisher client. The client batches messages per topic in background threads,
+        so the call returns immediately.
+        """
+        topic_path = self._source_to_topic_mapping[source]
+        data = company.model_dump_json().encode('utf-8')
+        return self._publisher_client.publish(topic_path, data)
+
+    async def _wait_published(self, pending: List[Tuple[Company, Str, futures.Future]], report: DispatchReport):
+        if not pending:
+            return
+        results = await asyncio.gather(
+            *[asyncio.wrap_future(future) for _, _, future in pending],
+            return_exceptions=True
+        )
+        for (company, source, _), result in zip(pending, results):
+            ok = not isinstance(result, BaseException)
+            report.add(source, ok)
+            if not ok:
+                self._logger.error("Failed to publish company data pull", exc_info=result, labels={
+                    "company": company.model_dump_for_logs(),
+                    "source": source,
+                    "exception": str(result),
+                })
@@ -2,7 +2,6 @@ from typing import AnyStr as Str, Dict
 from functools import cache
 from http import HTTPStatus
 
-from bson import ObjectId
 from httpx import HTTPError, HTTPStatusError, Response
 from pymongo.asynchronous.database import AsyncDatabase
 
@@ -11,31 +10,32 @@ from app.foundation.primitives import datetime
 
 from app.foundation.server import Logger
 from .data_syncer import DataFetcher, FetchResult
+from .company_context import CompanyContextLoader
 
 
 __all__ = ["LinkedInFetcher"]
 
 
 class LinkedInFetcher(DataFetcher):
+    UPDATED_AT_FIELD = "linkedInUpdatedAt"
+    UPDATE_INTERVAL = datetime.timedelta(days=1)
+
     def __init__(
             self,
             database: AsyncDatabase,
             scrapin_client: ScrapinClient,
-            logger: Logger
+            logger: Logger,
+            company_context: CompanyContextLoader = None,
     ):
         self._database = database
         self._companies_collection = database["companies"]
         self._scrapin_client = scrapin_client
         self._logger = logger
+        self._company_context = company_context or CompanyContextLoader(database)
 
     def source_id(self) -> str:
         return "linkedin"
 
-    def should_update(self, company: Company):
-        return company.linkedInUpdatedAt is None or (
-                company.linkedInUpdatedAt < datetime.now() - datetime.timedelta(days=1)
-        )
-
     async def fetch_company_data(self, company: Company) -> FetchResult:
         linkedin_id = None
         raw_data = await self._fetch_raw_data(company)
@@ -70,7 +70,7 @@ class LinkedInFetcher(DataFetcher):
         return await self._scrapin_client.extract_company_data(linkedin_url)
 
     async def _linkedin_url_from_db(self, company_id):
-        company = await self._companies_collection.find_one({"_id": ObjectId(company_id)})
+        company = await self._company_context.get(company_id)
         if not company or company.get("spectrUpdatedAt") is None:
             raise HTTPStatusError(
                 "Spectr data required for LinkedIn processing",
@@ -0,0 +1,22 @@
+from pydantic import BaseModel, Field
+
+from .constants import ACTIVE_COMPANY_STATUSES
+from .company_scanner import DEFAULT_PAGE_SIZE
+
+__all__ = ["SyncRequest", "EnrichRequest"]
+
+
+class SyncRequest(BaseModel):
+    sources: list[str]
+    max_items: int = 100000
+    statuses: list[str] | None = Field(default_factory=lambda: ACTIVE_COMPANY_STATUSES)
+    page_size: int = Field(default=DEFAULT_PAGE_SIZE, gt=0)
+    resume: bool = Field(default=True, description="Continue an interrupted run from its last checkpoint")
+    force: bool = Field(default=False, description="Dispatch companies even if their data is up-to-date")
+
+
+class EnrichRequest(BaseModel):
+    max_items: int = 100000
+    statuses: list[str] | None = Field(default_factory=lambda: ACTIVE_COMPANY_STATUSES)
+    page_size: int = Field(default=200, gt=0, description="Companies enriched per bulk write")
+    concurrency: int = Field(default=4, gt=0, description="Parallel Spectr lookups")
@@ -2,19 +2,16 @@ from http import HTTPStatus
 
 from fastapi import APIRouter, Body, Depends, Response
 from google.cloud import storage
-from pydantic import BaseModel, Field
 from pymongo.asynchronous.database import AsyncDatabase
 
-from app.foundation.server import dependencies, Logger
+from app.foundation.server import dependencies, Logger, AppConfig
 from app.shared import Company
 from app.shared.dependencies import get_scrapin_clinet, get_serpapi_client, get_genai_client, get_spectr_client
-from .constants import ACTIVE_COMPANY_STATUSES
-from .data_syncer import DataSyncer
-from .linkedin_fetcher import LinkedInFetcher
-from .googleplay_fetcher import GooglePlayFetcher
-from .apple_appstore_fetcher import AppleAppStoreFetcher
-from .google_jobs import GoogleJobsFetcher, GoogleJobsDataSyncer
-from .spectr_fetcher import SpectrFetcher
+from .models import SyncRequest, EnrichRequest
+from .sources import make_data_syncer
+from .spectr_enrichment import SpectrBulkEnricher, EnrichmentReport
+from .company_scanner import CompanyScanner
+from .constants import IN_AIRTABLE
 from .data_freshness_monitor import DataFreshnessMonitor
 from .dependencies import get_job_dispatcher
 from .job_dispatcher import JobDispatcher
@@ -24,12 +21,6 @@ router = APIRouter(
 )
 
 
-class SyncRequest(BaseModel):
-    sources: list[str]
-    max_items: int = 100000
-    statuses: list[str] | None = Field(default_factory=lambda: ACTIVE_COMPANY_STATUSES)
-
-
 @router.post('/pull', status_code=HTTPStatus.ACCEPTED)
 async def trigger_sync(
         data: SyncRequest = Body(),
@@ -41,11 +32,21 @@ async def trigger_sync(
         "maxItems": data.max_items,
         "statuses": data.statuses,
     })
-    cnt = await job_dispatcher.trigger_many(max_items=data.max_items, sources=data.sources, statuses=data.statuses)
-    if cnt:
+    report = await job_dispatcher.trigger_many(
+        max_items=data.max_items,
+        sources=data.sources,
+        statuses=data.statuses,
+        page_size=data.page_size,
+        resume=data.resume,
+        force=data.force,
+    )
+    if report.total or report.failed:
         logger.info(f"Finished company data pull", labels={
             "sources": data.sources,
-            "count": cnt,
+            "count": report.total,
+            "published": report.published,
+            "failed": report.failed,
+            "upToDate": report.up_to_date,
             "maxItems": data.max_items,
         })
     return
@@ -67,6 +68,16 @@ async def get_data_freshness_report(
     return report
 
 
+@router.get('/freshness/lag')
+async def get_data_lag_report(
+    database: AsyncDatabase = Depends(dependencies.get_default_database),
+    logger: Logger = Depends(dependencies.get_logger),
+):
+    """Get lag percentiles and histograms, in days, of every data source for active companies"""
+    monitor = DataFreshnessMonitor(database, logger)
+    return await monitor.check_lag_distribution()
+
+
 @router.post('/pull/linkedin', status_code=HTTPStatus.ACCEPTED)
 async def sync_company_linkedin(
         data: Company = Body(),
@@ -75,17 +86,12 @@ async def sync_company_linkedin(
         scrapin_client = Depends(get_scrapin_clinet),
         logger: Logger = Depends(dependencies.get_logger),
 ):
-    fetcher = LinkedInFetcher(
+    data_syncer = make_data_syncer(
+        "linkedin",
         database=database,
-        scrapin_client=scrapin_client,
-        logger=logger,
-    )
-
-    data_syncer = DataSyncer(
         dataset_bucket=dataset_bucket,
-        database=database,
-        data_fetcher=fetcher,
         logger=logger,
+        scrapin_client=scrapin_client,
     )
 
     await data_syncer.sync_one(company=data)
@@ -100,17 +106,12 @@ async def sync_company_googleplay(
         serpapi_client = Depends(get_serpapi_client),
         logger: Logger = Depends(dependencies.get_logger),
 ):
-    fetcher = GooglePlayFetcher(
+    data_syncer = make_data_syncer(
+        "googleplay",
         database=database,
-        serpapi_client=serpapi_client,
-        logger=logger,
-    )
-
-    data_syncer = DataSyncer(
         dataset_bucket=dataset_bucket,
-        database=database,
-        data_fetcher=fetcher,
         logger=logger,
+        serpapi_client=serpapi_client,
     )
 
     await data_syncer.sync_one(company=data)
@@ -125,17 +126,12 @@ async def sync_company_appstore(
         serpapi_client = Depends(get_serpapi_client),
         logger: Logger = Depends(dependencies.get_logger),
 ):
-    fetcher = AppleAppStoreFetcher(
+    data_syncer = make_data_syncer(
+        "appstore",
         database=database,
-        serpapi_client=serpapi_client,
-        logger=logger,
-    )
-
-    data_syncer = DataSyncer(
         dataset_bucket=dataset_bucket,
-        database=database,
-        data_fetcher=fetcher,
         logger=logger,
+        serpapi_client=serpapi_client,
     )
 
     await data_syncer.sync_one(company=data)
@@ -149,20 +145,17 @@ async def sync_company_google_jobs(
         dataset_bucket: storage.Bucket = Depends(dependencies.get_dataset_bucket),
         serpapi_client=Depends(get_serpapi_client),
         genai_client=Depends(get_genai_client),
+        config: AppConfig = Depends(dependencies.get_config),
         logger: Logger = Depends(dependencies.get_logger),
 ):
-    fetcher = GoogleJobsFetcher(
+    data_syncer = make_data_syncer(
+        "google_jobs",
         database=database,
-        serpapi_client=serpapi_client,
-        logger=logger,
-        genai_client=genai_client,
-    )
-
-    data_syncer = GoogleJobsDataSyncer(
         dataset_bucket=dataset_bucket,
-        database=database,
-        data_fetcher=fetcher,
         logger=logger,
+        serpapi_client=serpapi_client,
+        genai_client=genai_client,
+        config=config,
     )
 
     await data_syncer.sync_one(company=data)
@@ -177,17 +170,50 @@ async def sync_company_spectr(
         spectr_client = Depends(get_spectr_client),
         logger: Logger = Depends(dependencies.get_logger),
 ):
-    fetcher = SpectrFetcher(
-        spectr_client=spectr_client,
+    data_syncer = make_data_syncer(
+        "spectr",
+        database=database,
+        dataset_bucket=dataset_bucket,
         logger=logger,
+        spectr_client=spectr_client,
     )
 
-    data_syncer = DataSyncer(
-        dataset_bucket=dataset_bucket,
+    await data_syncer.sync_one(company=data)
+    return
+
+
+@router.post('/enrich/spectr')
+async def enrich_companies_spectr(
+        data: EnrichRequest = Body(),
+        database: AsyncDatabase = Depends(dependencies.get_default_database),
+        dataset_bucket: storage.Bucket = Depends(dependencies.get_dataset_bucket),
+        spectr_client = Depends(get_spectr_client),
+        logger: Logger = Depends(dependencies.get_logger),
+):
+    """Match companies without spectrId to Spectr in bulk"""
+    enricher = SpectrBulkEnricher(
         database=database,
-        data_fetcher=fetcher,
+        dataset_bucket=dataset_bucket,
+        spectr_client=spectr_client,
         logger=logger,
+        concurrency=data.concurrency,
     )
-
-    await data_syncer.sync_one(company=data)
-    return
\ No newline at end of file
+    query = {"spectrId": None, **IN_AIRTABLE}
+    if data.statuses:
+        query["status"] = {"$in": data.statuses}
+
+    total = EnrichmentReport()
+    scanner = CompanyScanner(database, logger, page_size=data.page_size)
+    async for page in scanner.pages(query, max_items=data.max_items):
+        companies = []
+        for company_data in page:
+            try:
+                companies.append(Company.model_validate(company_data))
+            except Exception as e:
+                logger.error("Invalid company document", exc_info=e, labels={
+                    "company": {"id": str(company_data.get("_id")), "name": company_data.get("name")},
+                })
+        report = await enricher.enrich_many(companies)
+        for name, value in vars(report).items():
+            setattr(total, name, getattr(total, name) + value)
+    return total
@@ -0,0 +1,108 @@
+from typing import Dict, List, Type
+
+from google.cloud import storage
+from pymongo.asynchronous.database import AsyncDatabase
+
+from app.foundation.primitives import datetime
+from app.foundation.server import Logger
+
+from .company_context import CompanyContextLoader
+from .data_syncer import DataFetcher, DataSyncer
+from .linkedin_fetcher import LinkedInFetcher
+from .googleplay_fetcher import GooglePlayFetcher
+from .apple_appstore_fetcher import AppleAppStoreFetcher
+from .google_jobs import GoogleJobsFetcher, GoogleJobsDataSyncer
+from .spectr_fetcher import SpectrFetcher
+
+__all__ = ["SOURCE_FETCHERS", "stale_filter", "make_data_syncer"]
+
+# Dispatch source name (topic suffix and /pull/{source} route) to the fetcher that syncs it
+SOURCE_FETCHERS: Dict[str, Type[DataFetcher]] = {
+    "linkedin": LinkedInFetcher,
+    "spectr": SpectrFetcher,
+    "googleplay": GooglePlayFetcher,
+    "appstore": AppleAppStoreFetcher,
+    "google_jobs": GoogleJobsFetcher,
+}
+
+
+def stale_filter(sources: List[str], now: datetime.datetime) -> Dict:
+    """
+    Companies which are stale for at least one of the sources. Empty dict when any source is always stale.
+    """
+    clauses = []
+    for source in sources:
+        source_filter = SOURCE_FETCHERS[source].stale_filter(now)
+        if not source_filter:
+            return {}
+        clauses.extend(source_filter["$or"])
+    return {"$or": clauses} if clauses else {}
+
+
+def make_data_syncer(
+        source: str,
+        database: AsyncDatabase,
+        dataset_bucket: storage.Bucket,
+        logger: Logger,
+        scrapin_client=None,
+        serpapi_client=None,
+        spectr_client=None,
+        genai_client=None,
+        config=None,
+        company_context: CompanyContextLoader = None,
+) -> DataSyncer:
+    """
+    Wire the fetcher and syncer of the source for the /pull/{source} routes and the in-process worker.
+    Without `company_context` the syncer gets its own loader, scoped to the syncer.
+    """
+    config = config or {}
+    company_context = company_context or CompanyContextLoader(database)
+    syncer_class = DataSyncer
+    if source == "linkedin":
+        fetcher = LinkedInFetcher(
+            database=database,
+            scrapin_client=scrapin_client,
+            logger=logger,
+            company_context=company_context,
+        )
+    elif source == "googleplay":
+        fetcher = GooglePlayFetcher(
+            database=database,
+            serpapi_client=serpapi_client,
+            logger=logger,
+            company_context=company_context,
+        )
+    elif source == "appstore":
+        fetcher = AppleAppStoreFetcher(
+            database=database,
+            serpapi_client=serpapi_client,
+            logger=logger,
+            company_context=company_context,
+        )
+    elif source == "google_jobs":
+        google_jobs_config = config.get('google_jobs', {})
+        fetcher = GoogleJobsFetcher(
+            database=database,
+            serpapi_client=serpapi_client,
+            logger=logger,
+            genai_client=genai_client,
+            validation_concurrency=int(google_jobs_config.get('validation_concurrency', 8)),
+            validation_batch_size=int(google_jobs_config.get('validation_batch_size', 5)),
+            max_pages=int(google_jobs_config.get('max_pages', 5)),
+        )
+        syncer_class = GoogleJobsDataSyncer
+    elif source == "spectr":
+        fetcher = SpectrFetcher(
+            spectr_client=spectr_client,
+            logger=logger,
+            database=database,
+        )
+    else:
+        raise ValueError(f"Unsupported source {source}")
+
+    return syncer_class(
+        dataset_bucket=dataset_bucket,
+        database=database,
+        data_fetcher=fetcher,
+        logger=logger,
+    )
@@ -0,0 +1,131 @@
+import asyncio
+from dataclasses import dataclass
+from http import HTTPStatus
+from typing import Dict, List
+
+from bson import ObjectId
+from google.cloud import storage
+from httpx import HTTPStatusError
+from pymongo import UpdateOne
+from pymongo.asynchronous.database import AsyncDatabase
+
+from app.foundation.server import Logger
+from app.shared import Company, SpectrClient
+from app.shared.url_utils import extract_domain
+from .data_syncer import DataSyncer
+from .spectr_fetcher import SpectrFetcher
+
+__all__ = ["SpectrBulkEnricher", "EnrichmentReport"]
+
+
+@dataclass
+class EnrichmentReport:
+    companies: int = 0
+    lookups: int = 0
+    matched: int = 0
+    not_found: int = 0
+    unmatched: int = 0
+    failed: int = 0
+
+
+class SpectrBulkEnricher(object):
+    """
+    Enriches companies without spectrId in bulk. Companies are grouped by root domain so each domain costs
+    one Spectr call, calls run with bounded concurrency and all outcomes are written with one bulk write.
+    """
+
+    def __init__(
+            self,
+            database: AsyncDatabase,
+            dataset_bucket: storage.Bucket,
+            spectr_client: SpectrClient,
+            logger: Logger,
+            concurrency: int = 4,
+    ):
+        self._companies_collection = database["companies"]
+        self._spectr_client = spectr_client
+        self._logger = logger
+        self._concurrency = max(1, concurrency)
+        self._fetcher = SpectrFetcher(spectr_client=spectr_client, logger=logger)
+        self._syncer = DataSyncer(
+            dataset_bucket=dataset_bucket,
+            database=database,
+            data_fetcher=self._fetcher,
+            logger=logger,
+        )
+
+    async def enrich_many(self, companies: List[Company]) -> EnrichmentReport:
+        report = EnrichmentReport()
+        groups: Dict[str, List[Company]] = {}
+        for company in companies:
+            if company.spectrId or not company.has_valid_website():
+                continue
+            domain = extract_domain(company.domain or company.website)
+            if not domain:
+                continue
+            groups.setdefault(domain, []).append(company)
+            report.companies += 1
+        if not groups:
+            return report
+
+        semaphore = asyncio.Semaphore(self._concurrency)
+
+        async def lookup(domain: str):
+            async with semaphore:
+                return await self._lookup(domain)
+
+        results = await asyncio.gather(*[lookup(domain) for domain in groups], return_exceptions=True)
+        report.lookups = len(groups)
+
+        operations = []
+        raw_data_uploads = []
+        for (domain, group), candidates in zip(groups.items(), results):
+            if isinstance(candidates, BaseException):
+                report.failed += len(group)
+                self._logger.error("Spectr bulk enrichment lookup failed", exc_info=candidates, labels={
+                    "domain": domain,
+                    "companies": [company.model_dump_for_logs() for company in group],
+                    "exception": str(candidates),
+                })
+                continue
+            for company in group:
+                if candidates is None:
+                    report.not_found += 1
+                    continue
+                result = self._fetcher.enrichment_result(company, candidates)
+                if result.raw_data:
+                    raw_data_uploads.append(self._syncer.store_raw_data(company, result))
+                if not result.db_update_fields:
+                    report.unmatched += 1
+                    continue
+                report.matched += 1
+                if company.id:
+                    operations.append(UpdateOne({"_id": ObjectId(company.id)}, {"$set": result.db_update_fields}))
+
+        uploads = await asyncio.gather(*raw_data_uploads, return_exceptions=True)
+        for upload in uploads:
+            if isinstance(upload, BaseException):
+                self._logger.error("Failed to store Spectr raw data", exc_info=upload, labels={
+                    "exception": str(upload),
+                })
+        if operations:
+            await self._companies_collection.bulk_write(operations, ordered=False)
+
+        self._logger.info("Spectr bulk enrichment completed", labels={
+            "companies": report.companies,
+            "lookups": report.lookups,
+            "matched": report.matched,
+            "notFound": report.not_found,
+            "unmatched": report.unmatched,
+            "failed": report.failed,
+        })
+        return report
+
+    async def _lookup(self, domain: str) -> List[Dict] | None:
+        """Candidates for the domain, None if Spectr does not know it"""
+        try:
+            return await self._spectr_client.enrich_companies(domain=domain)
+        except HTTPStatusError as e:
+            if e.response.status_code == HTTPStatus.NOT_FOUND:
+                return None
+            raise
@@ -1,38 +1,45 @@
 from http import HTTPStatus
+from typing import Any, Dict, List, Set, Tuple
+from bson import ObjectId
 from httpx import HTTPStatusError
+from pymongo.asynchronous.database import AsyncDatabase
 
 from app.shared import Company, SpectrClient
+from app.shared.url_utils import extract_domain
 from app.foundation.primitives import datetime
 from app.foundation.server import Logger
 from .data_syncer import DataFetcher, FetchResult
 
-__all__ = ["SpectrFetcher"]
+__all__ = ["SpectrFetcher", "match_spectr_company"]
 
 
 class SpectrFetcher(DataFetcher):
+    UPDATED_AT_FIELD = "spectrUpdatedAt"
+    FRESHNESS_THRESHOLD = datetime.timedelta(days=32)
+
     def __init__(
             self,
             spectr_client: SpectrClient,
-            logger: Logger
+            logger: Logger,
+            database: AsyncDatabase = None,
+            incremental: bool = True,
     ):
+        """
+        :param database: enables incremental refresh, stored `spectrData` is compared with the fetched one
+        :param incremental: skip unchanged companies and write changed `spectrData` fields only
+        """
         self._spectr_client = spectr_client
         self._logger = logger
+        self._companies_collection = database["companies"] if database is not None else None
+        self._incremental = incremental
 
     def source_id(self) -> str:
         return "spectr"
 
-    def should_update(self, company: Company):
-        if company.spectrUpdatedAt is None:
-            return True
-        
-        now = datetime.now()
-        last_update = company.spectrUpdatedAt
-        
+    @classmethod
+    def stale_before(cls, now: datetime.datetime) -> datetime.datetime:
         # If last update was in current month, data is up to date
-        if last_update.year == now.year and last_update.month == now.month:
-            return False
-
-        return True
+        return datetime.midnight(now).replace(day=1)
 
     async def fetch_company_data(self, company: Company) -> FetchResult:
         if not company.spectrId:
@@ -57,8 +64,13 @@ class SpectrFetcher(DataFetcher):
                     )
                     return FetchResult()
                 raise
-        
-        if not enrichment_result or not isinstance(enrichment_result, list) or len(enrichment_result) != 1:
+        return self.enrichment_result(company, enrichment_result)
+
+    def enrichment_result(self, company: Company, enrichment_result) -> FetchResult:
+        """Turn `enrich_companies` output into a fetch result, picking the candidate with the company domain."""
+        domain = extract_domain(company.domain or company.website or "")
+        spectr_company = match_spectr_company(domain, enrichment_result)
+        if not spectr_company:
             self._logger.info(
                 'Spectr enrichment failed',
                 labels={
@@ -70,9 +82,8 @@ class SpectrFetcher(DataFetcher):
             )
             return FetchResult(raw_data=enrichment_result)
 
-        spectr_company = enrichment_result[0]
         last_updated = datetime.any_to_datetime(spectr_company.get("last_updated"))
-        
+
         return FetchResult(
             raw_data=spectr_company,
             remote_id=spectr_company['id'],
@@ -119,6 +130,31 @@ class SpectrFetcher(DataFetcher):
             )
         last_updated = datetime.any_to_datetime(spectr_company.get("last_updated"))
 
+        stored_data = await self._stored_spectr_data(company) if self._incremental else None
+        if stored_data is not None:
+            stored_last_updated = datetime.any_to_datetime(stored_data.get("last_updated"))
+            if last_updated is not None and stored_last_updated == last_updated:
+                # Nothing changed remotely, only remember that we checked
+                return FetchResult(
+                    remote_id=company.spectrId,
+                    db_update_fields={'spectrUpdatedAt': datetime.now()},
+                    updated_at=last_updated,
+                    stats={'spectrChanged': False},
+                )
+            db_update_fields, db_unset_fields = _spectr_data_diff(stored_data, spectr_company)
+            if db_update_fields is not None:
+                return FetchResult(
+                    raw_data=spectr_company,
+                    remote_id=company.spectrId,
+                    db_update_fields={
+                        'spectrUpdatedAt': datetime.now(),
+                        **db_update_fields,
+                    },
+                    db_unset_fields=db_unset_fields,
+                    updated_at=last_updated,
+                    stats={'spectrChanged': True, 'changedFields': len(db_update_fields) + len(db_unset_fields)},
+                )
+
         return FetchResult(
             raw_data=spectr_company,
             remote_id=company.spectrId,
@@ -128,3 +164,61 @@ class SpectrFetcher(DataFetcher):
             },
             updated_at=last_updated
         )
+
+    async def _stored_spectr_data(self, company: Company) -> Dict[str, Any] | None:
+        if self._companies_collection is None or not company.id:
+            return None
+        document = await self._companies_collection.find_one(
+            {'_id': ObjectId(company.id)},
+            projection={'spectrData': 1},
+        )
+        spectr_data = (document or {}).get('spectrData')
+        return spectr_data if isinstance(spectr_data, dict) else None
+
+
+def _spectr_data_diff(stored: Dict[str, Any], fetched: Dict[str, Any]) -> Tuple[Dict[str, Any] | None, Dict[str, Any]]:
+    """
+    Top level `spectrData.<key>` fields to `$set` and `$unset`. Returns None for `$set` when keys cannot be
+    used in a dotted path and the whole document has to be replaced.
+    """
+    if any('.' in key or key.startswith('$') for key in fetched):
+        return None, {}
+    to_set = {
+        f'spectrData.{key}': value
+        for key, value in fetched.items()
+        if key not in stored or stored[key] != value
+    }
+    # fetchedAt is added when raw data is stored
+    to_set['spectrData.fetchedAt'] = datetime.now()
+    to_unset = {
+        f'spectrData.{key}': ""
+        for key in stored
+        if key not in fetched and key != 'fetchedAt'
+    }
+    return to_set, to_unset
+
+
+def _spectr_domains(spectr_company: Dict[str, Any]) -> Set[str]:
+    """Root domains a Spectr company is known under"""
+    values = [spectr_company.get("domain")]
+    website = spectr_company.get("website")
+    if isinstance(website, dict):
+        values += [website.get("url"), website.get("domain")] + list(website.get("domain_aliases") or [])
+    else:
+        values.append(website)
+    return {extract_domain(value) for value in values if isinstance(value, str) and value}
+
+
+def match_spectr_company(domain: str | None, candidates: List[Dict[str, Any]] | Any) -> Dict[str, Any] | None:
+    """
+    Pick the enrichment candidate for the company. A single candidate is taken as is,
+    of several the one whose domain matches `domain` wins, ambiguous results match nothing.
+    """
+    if not candidates or not isinstance(candidates, list):
+        return None
+    if len(candidates) == 1:
+        return candidates[0]
+    if not domain:
+        return None
+    matches = [candidate for candidate in candidates if domain in _spectr_domains(candidate)]
+    return matches[0] if len(matches) == 1 else None
@@ -0,0 +1,173 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from pymongo.asynchronous.database import AsyncDatabase
+
+from app.foundation.primitives import datetime
+from app.foundation.server import Logger
+from app.shared import Company, CompanyStatus
+from .company_context import CompanyContextLoader
+from .company_scanner import CompanyScanner
+from .constants import IN_AIRTABLE
+from .data_syncer import DataSyncer
+from .models import SyncRequest
+from .sources import SOURCE_FETCHERS, stale_filter
+
+__all__ = ["CompanyDataWorker", "WorkerProgress"]
+
+# Seconds between progress log records
+PROGRESS_INTERVAL = 10
+
+
+@dataclass
+class WorkerProgress:
+    scanned: int = 0
+    synced: Dict[str, int] = field(default_factory=dict)
+    failed: Dict[str, int] = field(default_factory=dict)
+    up_to_date: Dict[str, int] = field(default_factory=dict)
+    started_at: float = field(default_factory=time.monotonic)
+
+    def add(self, counter: Dict[str, int], source: str):
+        counter[source] = counter.get(source, 0) + 1
+
+    def as_labels(self) -> Dict:
+        return {
+            "scanned": self.scanned,
+            "synced": self.synced,
+            "failed": self.failed,
+            "upToDate": self.up_to_date,
+            "elapsed": round(time.monotonic() - self.started_at, 1),
+        }
+
+
+class CompanyDataWorker(object):
+    """
+    Runs `DataSyncer.sync_one` in process for companies matching a `SyncRequest`, without going through Pub/Sub.
+    Every source gets its own queue and a fixed number of consumers, so a slow upstream does not hold the others.
+    A company is evicted from the shared `company_context` once all its sources are synced.
+    """
+
+    def __init__(
+            self,
+            database: AsyncDatabase,
+            syncers: Dict[str, DataSyncer],
+            logger: Logger,
+            concurrency: int | Dict[str, int] = 4,
+            company_context: CompanyContextLoader = None,
+    ):
+        self._database = database
+        self._syncers = syncers
+        self._logger = logger
+        self._concurrency = concurrency
+        self._company_context = company_context
+        # Company id -> sources still queued or syncing
+        self._pending: Dict[str, int] = {}
+
+    def _source_concurrency(self, source: str) -> int:
+        if isinstance(self._concurrency, dict):
+            return max(1, int(self._concurrency.get(source, 1)))
+        return max(1, int(self._concurrency))
+
+    async def run(self, request: SyncRequest) -> WorkerProgress:
+        progress = WorkerProgress()
+        sources = [source for source in request.sources if source in self._syncers and source in SOURCE_FETCHERS]
+        if len(sources) != len(request.sources):
+            self._logger.warning("Some sources are not supported", labels={
+                "sources": request.sources,
+                "supported_sources": sources,
+            })
+        if not sources:
+            return progress
+
+        now = datetime.now()
+        statuses = request.statuses
+        query = {'status': {'$in': [str(status) for status in statuses]}} if statuses else {'status': str(CompanyStatus.INVESTED)}
+        query |= IN_AIRTABLE
+        if not request.force:
+            query |= stale_filter(sources, now)
+
+        queues = {source: asyncio.Queue(maxsize=self._source_concurrency(source) * 2) for source in sources}
+        consumers = [
+            asyncio.create_task(self._consume(source, queues[source], progress))
+            for source in sources
+            for _ in range(self._source_concurrency(source))
+        ]
+        reporter = asyncio.create_task(self._report(progress))
+        self._logger.info("Company data worker started", labels={
+            "sources": sources,
+            "maxItems": request.max_items,
+            "statuses": statuses,
+        })
+        try:
+            scanner = CompanyScanner(self._database, self._logger, page_size=request.page_size)
+            async for page in scanner.pages(query, max_items=request.max_items):
+                for company_data in page:
+                    progress.scanned += 1
+                    try:
+                        company = Company.model_validate(company_data)
+                    except Exception as e:
+                        self._logger.error("Invalid company document", exc_info=e, labels={
+                            "company": {"id": str(company_data.get("_id")), "name": company_data.get("name")},
+                        })
+                        continue
+                    if not company.has_valid_website():
+                        continue
+                    stale_sources = []
+                    for source in sources:
+                        if not request.force and not SOURCE_FETCHERS[source].is_stale(company, now):
+                            progress.add(progress.up_to_date, source)
+                            continue
+                        stale_sources.append(source)
+                    if stale_sources:
+                        self._pending[company.id] = len(stale_sources)
+                    for source in stale_sources:
+                        await queues[source].put(company)
+
+            for queue in queues.values():
+                await queue.join()
+        except asyncio.CancelledError:
+            self._logger.warning("Company data worker cancelled", labels=progress.as_labels())
+            raise
+        finally:
+            for task in consumers + [reporter]:
+                task.cancel()
+            await asyncio.gather(*consumers, reporter, return_exceptions=True)
+
+        self._logger.info("Company data worker finished", labels=progress.as_labels())
+        return progress
+
+    async def _consume(self, source: str, queue: asyncio.Queue, progress: WorkerProgress):
+        syncer = self._syncers[source]
+        while True:
+            company = await queue.get()
+            try:
+                await syncer.sync_one(company)
+                progress.add(progress.synced, source)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                progress.add(progress.failed, source)
+                self._logger.error("Failed to sync company data", exc_info=e, labels={
+                    "company": company.model_dump_for_logs(),
+                    "source": source,
+                    "exception": str(e),
+                })
+            finally:
+                self._release(company)
+                queue.task_done()
+
+    def _release(self, company: Company):
+        pending = self._pending.get(company.id, 1) - 1
+        if pending > 0:
+            self._pending[company.id] = pending
+            return
+        self._pending.pop(company.id, None)
+        if self._company_context is not None:
+            self._company_context.evict(company.id)
+
+    async def _report(self, progress: WorkerProgress):
+        while True:
+            await asyncio.sleep(PROGRESS_INTERVAL)
+            self._logger.info("Company data worker progress", labels=progress.as_labels())
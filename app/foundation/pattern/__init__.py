@@ -1,3 +1,4 @@
 from . class_factory import *
 from . exponential_backoff import *
 from . singleton import *
+from . rate_limiter import *
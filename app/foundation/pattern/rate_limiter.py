@@ -0,0 +1,134 @@
+import asyncio
+import time
+import typing
+from http import HTTPStatus
+
+
+__all__ = ["RateLimiter", "rate_limiter"]
+
+
+class RateLimiter(object):
+    """
+    Token bucket with an optional cap on concurrent calls.
+
+    The bucket refills at `rate` tokens per second up to `capacity`. Upstreams which report their quota in
+    response headers can shrink the bucket or pause it until the quota resets, see `update_from_headers`.
+
+    Example:
+        limiter = rate_limiter("spectr", rate=5, capacity=10, concurrency=4)
+        async with limiter:
+            response = await http_client.get(url)
+        limiter.update_from_headers(response.headers, response.status_code)
+    """
+
+    def __init__(self, name: str, rate: float, capacity: float = None, concurrency: int = None):
+        assert rate > 0, "Rate must be positive"
+        self.name = name
+        self._rate = float(rate)
+        self._capacity = float(capacity or max(1.0, rate))
+        self._tokens = self._capacity
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+        self._semaphore = asyncio.Semaphore(concurrency) if concurrency else None
+
+    async def acquire(self, tokens: float = 1):
+        """
+        Wait for a concurrency slot and `tokens` from the bucket. Waiters are served in FIFO order.
+        """
+        tokens = min(float(tokens), self._capacity)
+        if self._semaphore:
+            await self._semaphore.acquire()
+        try:
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    wait = self._paused_until - now
+                    if wait <= 0:
+                        if self._tokens >= tokens:
+                            self._tokens -= tokens
+                            return
+                        wait = (tokens - self._tokens) / self._rate
+                    await asyncio.sleep(wait)
+        except BaseException:
+            self.release()
+            raise
+
+    def release(self):
+        if self._semaphore:
+            self._semaphore.release()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+    def pause(self, seconds: float):
+        """
+        Stop handing out tokens for `seconds`
+        """
+        if seconds and seconds > 0:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def update_quota(self, remaining: float | None, reset: float | None):
+        """
+        Align the bucket with the quota reported by the upstream.
+
+        :param remaining: requests left in the current upstream window
+        :param reset: seconds until the upstream window resets
+        """
+        if remaining is None:
+            return
+        self._refill(time.monotonic())
+        if remaining <= 0:
+            self._tokens = 0
+            self.pause(reset if reset is not None else 1 / self._rate)
+            return
+        self._tokens = min(self._tokens, remaining)
+
+    def update_from_headers(self, headers: typing.Mapping[str, str], status_code: int = None):
+        remaining = _to_float(headers.get("X-RateLimit-Remaining"))
+        reset = _to_seconds(headers.get("X-RateLimit-Reset"))
+        self.update_quota(remaining, reset)
+        if status_code == HTTPStatus.TOO_MANY_REQUESTS:
+            retry_after = _to_seconds(headers.get("Retry-After"))
+            self.pause(retry_after or reset or 1 / self._rate)
+
+    def _refill(self, now: float):
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated_at) * self._rate)
+        self._updated_at = now
+
+
+_limiters: typing.Dict[str, RateLimiter] = {}
+
+
+def rate_limiter(name: str, rate: float, capacity: float = None, concurrency: int = None) -> RateLimiter:
+    """
+    Process-wide limiter for the upstream `name`. Settings of the first call win.
+    """
+    limiter = _limiters.get(name)
+    if limiter is None:
+        limiter = _limiters[name] = RateLimiter(name, rate=rate, capacity=capacity, concurrency=concurrency)
+    return limiter
+
+
+def _to_float(value) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_seconds(value) -> float | None:
+    """
+    Reset values come either as delta seconds or as a unix timestamp
+    """
+    seconds = _to_float(value)
+    if seconds is None:
+        return None
+    if seconds > 10 ** 9:
+        seconds -= time.time()
+    return max(seconds, 0.0)
@@ -26,7 +26,9 @@ def dump(data, fp):
     return true_json.dump(data, fp, default=convert_date, indent=2, sort_keys=True)
 
 
-def dumps(data):
+def dumps(data, compact=False):
+    if compact:
+        return true_json.dumps(data, default=convert_date, separators=(',', ':'), sort_keys=True)
     return true_json.dumps(data, default=convert_date, indent=2, sort_keys=True)
 
 
@@ -1,12 +1,13 @@
+import hashlib
 from typing import Dict, Any
+from pymongo import UpdateOne
 from pymongo.asynchronous.mongo_client import AsyncMongoClient
-from pymongo.asynchronous.collection import AsyncCollection
 
 from app.shared import Company, CompanyStatus, AirTableClient
 from app.shared.url_utils import normalize_url, is_valid_website_url, extract_domain
 from app.foundation.server import Logger
-from app.foundation.primitives import datetime
-from app.company_data.job_dispatcher import JobDispatcher
+from app.foundation.primitives import datetime, json
+from app.company_data.spectr_enrichment import SpectrBulkEnricher
 
 
 _STATUS_MAP = {
@@ -32,22 +33,33 @@ _STATUS_MAP = {
 
 
 
+# Incremental pulls only fetch records modified after the previous pull started. A full pull runs at this
+# cadence to catch deleted records and records which stopped being valid companies.
+# LAST_MODIFIED_TIME() does not change when a rollup or lookup value changes in a linked table, so such changes
+# (amounts invested, valuations, stages) reach Mongo with the next full pull only. Pass `full` to pick them up now.
+FULL_SYNC_INTERVAL = datetime.timedelta(days=7)
+# Overlap of incremental windows, covers clock skew between us and Airtable
+MODIFIED_SINCE_OVERLAP = datetime.timedelta(minutes=10)
+# A full pull which sees fewer valid records than this share of the tracked companies is treated as broken
+# (renamed field, status mapping drift, empty view) and marks nothing as missing
+MIN_FULL_PULL_SHARE = 0.5
+
+
 def _unwrap_single_item(value):
     if isinstance(value, list) and len(value) == 1:
         return value[0]
     return value
 
 
-async def _process_company_record(record: Dict[str, Any], companies_collection: AsyncCollection, logger: Logger, job_dispatcher: JobDispatcher) -> None:
+def _company_from_record(record: Dict[str, Any], logger: Logger) -> Company:
     """
-    Process an individual Airtable record and store it in MongoDB.
+    Map an Airtable record to a Company.
 
     Args:
         record (Dict[str, Any]): Airtable record data containing fields and metadata.
-        companies_collection (AsyncCollection): MongoDB collection for storing company data.
 
     Returns:
-        None: This function performs database operations but does not return a value.
+        Company: Company model without id.
     """
     fields = record["fields"]
     status = fields.get("Status")
@@ -113,58 +125,12 @@ async def _process_company_record(record: Dict[str, Any], companies_collection:
         }
     }
 
-    # Create Company model
-    company = Company.model_validate(company_data)
-
-    # Upsert to MongoDB (update if exists, insert if new)
-    result = await companies_collection.update_one(
-        {"airtableId": company.airtableId},
-        {
-            "$set": company.model_dump(exclude_none=True),
-            "$setOnInsert": {
-                "createdAt": datetime.now(),
-            }
-        },
-        upsert=True
-    )
+    return Company.model_validate(company_data)
 
-    if result.upserted_id:
-        company.id = str(result.upserted_id)
-        logger.info(
-            "Company inserted",
-            labels={
-                "company": company.model_dump_for_logs(),
-                "operation": "insert",
-                "airtableId": company.airtableId
-            }
-        )
-        # Trigger Spectr update if company has valid website
-        if company.has_valid_website():
-            try:
-                await job_dispatcher.trigger_one(company, "spectr")
-            except Exception as e:
-                logger.error(
-                    "Failed to trigger Spectr update",
-                    exc_info=e,
-                    labels={
-                        "company": company.model_dump_for_logs(),
-                    }
-                )
-    else:
-        logger.info(
-            "Company updated", 
-            labels={
-                "company": company.model_dump_for_logs(),
-                "operation": "update",
-                "airtableId": company.airtableId,
-                "matchedCount": result.matched_count,
-                "modifiedCount": result.modified_count
-            }
-        )
-    
 
-    
-    return True
+def _content_hash(company_fields: Dict[str, Any]) -> str:
+    """Hash of the fields we store from an Airtable record. Keys are sorted, so equal data gives equal hashes."""
+    return hashlib.sha256(json.dumps(company_fields, compact=True).encode('utf-8')).hexdigest()
 
 
 async def pull_companies_from_airtable(
@@ -172,45 +138,80 @@ async def pull_companies_from_airtable(
     mongo_client: AsyncMongoClient,
     table_id: str,
     logger: Logger,
-    job_dispatcher: JobDispatcher,
+    spectr_enricher: SpectrBulkEnricher,
+    force: bool = False,
+    full: bool | None = None,
 ) -> int:
     """
     Pull companies from Airtable and store them in MongoDB.
+
+    Only new records and records whose content hash differs from the stored `airtableHash` are written,
+    with one unordered bulk write. Inserted companies are matched to Spectr in bulk, one lookup per domain.
+
+    By default only records modified since the previous pull are fetched. Every `FULL_SYNC_INTERVAL` the
+    whole table is pulled and companies missing from it get `airtableMissingAt`, which takes them out of
+    company data syncs and the freshness report. Rollup and lookup changes are only seen by full pulls.
     
     Args:
-        http_client: HTTP client for Airtable API calls
+        airtable_client: Airtable client for the base with companies
         mongo_client: MongoDB client for storing data
-        api_key: Airtable API key
-        base_id: Airtable base ID
         table_id: Airtable table ID containing company data
+        spectr_enricher: Matches inserted companies to Spectr
+        force: Write every record even if its content did not change
+        full: Force (True) or skip (False) the full pull. None decides by `FULL_SYNC_INTERVAL`
         
     Returns:
         Number of records processed
     """
+    default_database = mongo_client.get_default_database()
+    companies_collection = default_database['companies']
+    state_collection = default_database['sync_state']
+    state_id = f"airtable:{airtable_client.base_id}:{table_id}"
+    started_at = datetime.now()
+
+    state = await state_collection.find_one({"_id": state_id}) or {}
+    modified_since = state.get("modifiedSince")
+    full_sync_at = state.get("fullSyncAt")
+    if full is None:
+        full = force or not modified_since or not full_sync_at or started_at - full_sync_at >= FULL_SYNC_INTERVAL
+    elif not full and not modified_since:
+        full = True
+
+    list_params = {}
+    if not full:
+        since = datetime.to_utc(modified_since - MODIFIED_SINCE_OVERLAP)
+        list_params["filterByFormula"] = f"IS_AFTER(LAST_MODIFIED_TIME(), DATETIME_PARSE('{since:%Y-%m-%dT%H:%M:%S}Z'))"
 
     # Get records from Airtable
     logger.info(
         "Starting Airtable companies sync",
-        labels={"table_id": table_id}
-    )
-    records = await airtable_client.list_records(table_id=table_id, resolve=True)
-    logger.info(
-        "Fetched records from Airtable",
-        labels={"table_id": table_id, "total_records": len(records)}
+        labels={"table_id": table_id, "full": full, "modifiedSince": modified_since}
     )
-    
-    default_database = mongo_client.get_default_database()
-    companies_collection = default_database['companies']
+
+    stored_hashes = {}
+    if not force:
+        cursor = companies_collection.find(
+            {"airtableId": {"$ne": None}},
+            projection={"_id": 0, "airtableId": 1, "airtableHash": 1},
+        )
+        async for doc in cursor:
+            stored_hashes[doc["airtableId"]] = doc.get("airtableHash")
 
     # Process each record
+    total_records = 0
     processed_count = 0
     skipped_count = 0
-    
-    for i, record in enumerate(records, 1):
+    unchanged_count = 0
+    operations = []
+    changed_companies = []
+
+    # Records are streamed, the next page is fetched while the current one is processed
+    seen_airtable_ids = set()
+    async for record in airtable_client.iter_records(table_id=table_id, resolve=True, **list_params):
+        total_records += 1
         fields = record["fields"]
         status = fields.get("Status")
         name = fields.get("Company")
-        url = fields.get('URL')
 
         if status not in _STATUS_MAP:
             logger.info(
@@ -235,20 +236,103 @@ async def pull_companies_from_airtable(
             skipped_count += 1
             continue
 
-        await _process_company_record(record, companies_collection, logger, job_dispatcher)
         processed_count += 1
+        seen_airtable_ids.add(record["id"])
+        company = _company_from_record(record, logger)
+        company_fields = company.model_dump(exclude_none=True)
+        content_hash = _content_hash(company_fields)
+        if stored_hashes.get(company.airtableId) == content_hash:
+            unchanged_count += 1
+            continue
+
+        operations.append(UpdateOne(
+            {"airtableId": company.airtableId},
+            {
+                "$set": {**company_fields, "airtableHash": content_hash},
+                "$setOnInsert": {
+                    "createdAt": datetime.now(),
+                }
+            },
+            upsert=True
+        ))
+        changed_companies.append(company)
+
+    inserted_companies = []
+    if operations:
+        result = await companies_collection.bulk_write(operations, ordered=False)
+        for index, upserted_id in result.upserted_ids.items():
+            company = changed_companies[index]
+            company.id = str(upserted_id)
+            inserted_companies.append(company)
+            logger.info(
+                "Company inserted",
+                labels={
+                    "company": company.model_dump_for_logs(),
+                    "operation": "insert",
+                    "airtableId": company.airtableId
+                }
+            )
+
+    # Match new companies with valid website to Spectr
+    spectr_companies = [company for company in inserted_companies if company.has_valid_website()]
+    if spectr_companies:
+        try:
+            await spectr_enricher.enrich_many(spectr_companies)
+        except Exception as e:
+            logger.error(
+                "Failed to enrich new companies with Spectr",
+                exc_info=e,
+                labels={
+                    "companies": len(spectr_companies),
+                }
+            )
+
+    missing_count = 0
+    if full:
+        tracked_count = await companies_collection.count_documents({"airtableId": {"$ne": None}, "airtableMissingAt": None})
+        if not seen_airtable_ids or len(seen_airtable_ids) < tracked_count * MIN_FULL_PULL_SHARE:
+            logger.error(
+                "Full Airtable pull saw too few companies, missing companies are not marked",
+                labels={
+                    "tableId": table_id,
+                    "seenCount": len(seen_airtable_ids),
+                    "trackedCount": tracked_count,
+                    "totalRecords": total_records,
+                }
+            )
+        else:
+            # Companies deleted in Airtable or turned into invalid records
+            missing_result = await companies_collection.update_many(
+                {"airtableId": {"$ne": None, "$nin": list(seen_airtable_ids)}, "airtableMissingAt": None},
+                {"$set": {"airtableMissingAt": started_at}},
+            )
+            missing_count = missing_result.modified_count
+    if seen_airtable_ids:
+        await companies_collection.update_many(
+            {"airtableId": {"$in": list(seen_airtable_ids)}, "airtableMissingAt": {"$ne": None}},
+            {"$unset": {"airtableMissingAt": ""}},
+        )
+
+    state_update = {"modifiedSince": started_at, "updatedAt": datetime.now()}
+    if full:
+        state_update["fullSyncAt"] = started_at
+    await state_collection.update_one({"_id": state_id}, {"$set": state_update}, upsert=True)
 
     # Summary logging
     logger.info(
         "Airtable companies sync completed",
         labels={
             "tableId": table_id,
-            "totalRecords": len(records),
+            "totalRecords": total_records,
             "processedCount": processed_count,
             "skippedCount": skipped_count,
-            "successRate": round((processed_count / len(records)) * 100, 1) if records else 0
+            "insertedCount": len(inserted_companies),
+            "updatedCount": len(changed_companies) - len(inserted_companies),
+            "unchangedCount": unchanged_count,
+            "missingCount": missing_count,
+            "full": full,
+            "successRate": round((processed_count / total_records) * 100, 1) if total_records else 0
         }
     )
     
     return processed_count
-
@@ -1,16 +1,49 @@
+import asyncio
+import time
 import typing
+from dataclasses import dataclass
+from http import HTTPStatus
 from urllib.parse import urlparse
 
+import httpx
 import yaml
 
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Tuple
 
 from app.shared import AirTable, AirTableClient, models
 from app.foundation.server import Logger
 
 
-__all__ = ['AirSyncAction']
+__all__ = ['AirSyncAction', 'invalidate_workspace_cache']
+
+# Seconds a parsed mapping and base schema are reused between pushes
+WORKSPACE_CACHE_TTL = 10 * 60
+
+
+@dataclass
+class _Workspace:
+    """
+    Base schema and field mapping compiled for pushes. Shared between requests, must not be modified.
+    """
+    tables: Dict[str, AirTable]
+    # mapping table -> [(data key, airtable field, constant value)]
+    mapping_plans: Dict[str, List[Tuple[str, str, typing.Any]]]
+    mapping_mtime: float | None
+    expires_at: float
+
+
+# (base id, mapping file) -> workspace
+_workspaces: Dict[Tuple[str, str | None], _Workspace] = {}
+
+
+def invalidate_workspace_cache(base_id: str = None):
+    """
+    Drop cached schemas and mappings of the base, or of all bases
+    """
+    for key in list(_workspaces):
+        if base_id is None or key[0] == base_id:
+            _workspaces.pop(key, None)
 
 
 class AirSyncAction(object):
@@ -26,9 +59,9 @@ class AirSyncAction(object):
         self.airtable_client = airtable_client
         self.deal_table_id = deal_table_id
         self.people_table_id = people_table_id
-        self._tables = {}
         self.logger = logger
-        self._mapping_schema = self._load_field_mapping(field_mapping_file)
+        self._field_mapping_file = field_mapping_file
+        self._workspace: _Workspace | None = None
 
     async def push(
             self,
@@ -56,18 +89,43 @@ class AirSyncAction(object):
         int
             The total number of records successfully pushed to Airtable.
         """
-        self._tables = await self.airtable_client.get_base_data()
-        return sum([
-            await self._push_main(startup, people, sources),
-            await self._push_people(people, sources)
-        ])
+        self._workspace = await self._load_workspace()
+        # Main and people records do not reference each other, so they are created concurrently
+        try:
+            return sum(await asyncio.gather(
+                self._push_main(startup, people, sources),
+                self._push_people(people, sources)
+            ))
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY:
+                # Likely the base schema changed under the cached one
+                invalidate_workspace_cache(self.airtable_client.base_id)
+            raise
+
+    async def _load_workspace(self) -> _Workspace:
+        key = (self.airtable_client.base_id, self._field_mapping_file)
+        mapping_file = Path('resources') / self._field_mapping_file if self._field_mapping_file else None
+        mapping_mtime = mapping_file.stat().st_mtime if mapping_file and mapping_file.is_file() else None
+        workspace = _workspaces.get(key)
+        if workspace and workspace.expires_at > time.monotonic() and workspace.mapping_mtime == mapping_mtime:
+            return workspace
+
+        tables = await self.airtable_client.get_base_data()
+        workspace = _Workspace(
+            tables=tables,
+            mapping_plans=self._compile_mapping(self._load_field_mapping(self._field_mapping_file)),
+            mapping_mtime=mapping_mtime,
+            expires_at=time.monotonic() + WORKSPACE_CACHE_TTL,
+        )
+        _workspaces[key] = workspace
+        return workspace
 
     async def _push_people(
             self,
             people: List[models.Person],
             sources: List[models.Source]
     ) -> int:
-        records = 0
+        records = []
         for person in people:
             data = {k: {'value': v} for k, v in person.model_dump(exclude='features').items()}
             data |= {f: v.model_dump() for f, v in person.features.items()}
@@ -75,10 +133,12 @@ class AirSyncAction(object):
 
             if not fields:
                 continue
+            records.append(fields)
 
-            await self.airtable_client.create_record(self.people_table_id, fields)
-            records += 1
-        return records
+        if not records:
+            return 0
+        created = await self.airtable_client.create_records(self.people_table_id, records)
+        return len(created)
 
     async def _push_main(
             self,
@@ -101,18 +161,14 @@ class AirSyncAction(object):
 
 
     def _make_fields_for_table(self, data, air_table_id, mapping_table_id, sources: List[models.Source]) -> typing.Dict:
-        target_table: AirTable | None = self._tables.get(air_table_id) or None
+        target_table: AirTable | None = self._workspace.tables.get(air_table_id) or None
         if target_table is None:
             self.logger.error(f"Table {self.deal_table_id} not found in base {self.airtable_client.base_id}")
             return {}
 
         mapped_data = self._apply_mapping(data, mapping_table_id)
         mapped_data_with_sources = self._update_sources(mapped_data, sources)
-        target_table.clear_data().set_data(mapped_data_with_sources)
-        record = target_table.model_dump()
-        fields = record.get('fields') or {}
-        fields = {k: v for k, v in fields.items() if v is not None}
-        return fields
+        return target_table.serialize_fields(mapped_data_with_sources)
 
     def _update_sources(self, data: typing.Dict[str, typing.Dict], sources: List[models.Source]) -> typing.Dict:
         '''
@@ -157,13 +213,7 @@ class AirSyncAction(object):
 
     def _apply_mapping(self, data: typing.Dict[str, typing.Any], table) -> typing.Dict:
         result = {}  # It can be more efficient inplace, however, this is a simple and easier to debug
-        table_mapping = self._mapping_schema.get(table) or {}
-        for key, field_mapping in table_mapping.items():
-            airtable_field_name = field_mapping.get('airtable_field')
-            if not airtable_field_name:
-                self.logger.warning(f'No "airtable_field" mapping found for field "{key}" in table "{table}"')
-                continue
-            mapped_value = field_mapping.get('value')
+        for key, airtable_field_name, mapped_value in self._workspace.mapping_plans.get(table) or []:
             if mapped_value:
                 result[airtable_field_name] = {
                     "value": mapped_value,
@@ -179,6 +229,22 @@ class AirSyncAction(object):
             result[key] = data[key]
         return result
 
+    def _compile_mapping(self, mapping_schema: Dict[str, Dict]) -> Dict[str, List[Tuple[str, str, typing.Any]]]:
+        """
+        Flatten the mapping of every table to (data key, airtable field, constant value) in mapping order
+        """
+        plans = {}
+        for table, table_mapping in (mapping_schema or {}).items():
+            plan = []
+            for key, field_mapping in (table_mapping or {}).items():
+                airtable_field_name = field_mapping.get('airtable_field')
+                if not airtable_field_name:
+                    self.logger.warning(f'No "airtable_field" mapping found for field "{key}" in table "{table}"')
+                    continue
+                plan.append((key, airtable_field_name, field_mapping.get('value')))
+            plans[table] = plan
+        return plans
+
     def _load_field_mapping(self, field_mapping_file) -> Dict[str, Dict]:
         if not field_mapping_file:
             return {}
@@ -2,13 +2,13 @@ from http import HTTPStatus
 
 from fastapi import APIRouter, Body, Depends, Response, Query
 from pymongo import MongoClient
-from google.cloud import pubsub
+from google.cloud import storage
 from .http_models import SyncDealRequest
 from .airtable import push_deal_to_airtable, AirTableConfig, pull_companies_from_airtable, AirTableClient
 from ..foundation import get_env
 from ..shared import dependencies
-from ..foundation.server.dependencies import get_mongo_client, get_logger, get_http_client, get_publisher_client, get_config
-from ..company_data.job_dispatcher import JobDispatcher
+from ..foundation.server.dependencies import get_mongo_client, get_logger, get_http_client, get_dataset_bucket
+from ..company_data.spectr_enrichment import SpectrBulkEnricher
 
 __all__ = ['router']
 
@@ -54,12 +54,14 @@ async def push_deal(
 async def airtable_pull_companies(
         http_client = Depends(get_http_client),
         mongo_client: MongoClient = Depends(get_mongo_client),
-        publisher_client: pubsub.PublisherClient = Depends(get_publisher_client),
+        dataset_bucket: storage.Bucket = Depends(get_dataset_bucket),
+        spectr_client = Depends(dependencies.get_spectr_client),
         logger = Depends(get_logger),
-        config = Depends(get_config),
+        full: bool | None = None,
 ):
     """
     Pull companies from Airtable and store them to MongoDB.
+    Pulls records modified since the previous run, the whole table once in a while or when `full` is set.
     """
 
     airtable_client = AirTableClient(
@@ -68,11 +70,11 @@ async def airtable_pull_companies(
         http_client=http_client
     )
     
-    job_dispatcher = JobDispatcher(
+    spectr_enricher = SpectrBulkEnricher(
         database=mongo_client.get_default_database(),
-        publisher_client=publisher_client,
-        project_id=config.project_id,
-        logger=logger
+        dataset_bucket=dataset_bucket,
+        spectr_client=spectr_client,
+        logger=logger,
     )
 
     await pull_companies_from_airtable(
@@ -80,7 +82,8 @@ async def airtable_pull_companies(
         mongo_client=mongo_client,
         table_id='tblJL5aEsZFa0x6zY',
         logger=logger,
-        job_dispatcher=job_dispatcher
+        spectr_enricher=spectr_enricher,
+        full=full,
     )
 
 
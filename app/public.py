@@ -15,7 +15,12 @@ class PublicServer(server.FastAPIServer):
         app.include_router(meetings.public_router, prefix='/api')
 
     async def __aenter__(self) -> Dict[Str, Any]:
+        from app.company_data.data_freshness_monitor import DataFreshnessMonitor
+        from app.company_data.indexes import ensure_jobs_indexes, ensure_freshness_indexes
+
         state = await super().__aenter__()
+        await ensure_jobs_indexes(self.default_database)
+        await ensure_freshness_indexes(self.default_database, DataFreshnessMonitor.data_sources().keys())
         return state | {
             "dataset_bucket": self.storage_client.bucket("dvc-dataset-v2"),
         }
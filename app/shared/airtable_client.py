@@ -1,5 +1,8 @@
+import asyncio
+import time
+from dataclasses import dataclass
 from functools import cached_property
-from typing import Dict, Any, List
+from typing import AsyncIterator, Callable, Dict, Any, List, Tuple
 from urllib.parse import urlparse
 
 import httpx
@@ -8,10 +11,19 @@ from pydantic import BaseModel, Field, model_serializer
 from . import models
 from .airtable_serializers import field_serializers
 
-__all__ = ['AirTableClient', 'AirTable', 'AirField']
+__all__ = ['AirTableClient', 'AirTable', 'AirField', 'AirFieldPlan']
 
 RECORDS_PER_PAGE = 100
 MAX_RECORDS_PER_REQUEST = 1_000_000
+# Airtable accepts up to 10 records per create/update request
+RECORDS_PER_WRITE = 10
+# Seconds the base schema and linked table lookups used for ID resolution are reused
+RESOLVE_CACHE_TTL = 5 * 60
+
+# base id -> (expires at, tables by id)
+_schema_cache: Dict[str, Tuple[float, Dict[str, 'AirTable']]] = {}
+# (base id, table id) -> (expires at, primary field value by record id)
+_lookup_cache: Dict[Tuple[str, str], Tuple[float, Dict[str, str]]] = {}
 
 
 class AirField(BaseModel):
@@ -34,41 +46,53 @@ class AirField(BaseModel):
 
     @model_serializer()
     def serialize_value(self):
-        if self.value is None:
-            return None
-        serializer = field_serializers.get(self.type, None)
-        if not serializer:
-            raise ValueError(f"No serializer found for field type {self.type}") from None
-        try:
-            raw_value = serializer(self.value)
-            if raw_value and self.type == 'richText':
-                return '\n'.join([raw_value, self.format_sources()])
-            return raw_value
-        except Exception as e:
-            raise ValueError(f"Failed to serialize field {self.name}={self.value}: {e}") from e
+        return self.value_serializer()(self.value, self.sources)
+
+    def value_serializer(self) -> Callable[[Any, List[models.SourceRef]], Any]:
+        """
+        Serialization of this field for any value and sources. Type lookups are done once, here.
+        """
+        name = self.name
+        field_type = self.type
+        serializer = field_serializers.get(field_type, None)
+        with_sources = field_type == 'richText'
+
+        def serialize(value: Any, sources: List[models.SourceRef]) -> Any:
+            if value is None:
+                return None
+            if not serializer:
+                raise ValueError(f"No serializer found for field type {field_type}") from None
+            try:
+                raw_value = serializer(value)
+                if raw_value and with_sources:
+                    return '\n'.join([raw_value, format_sources(sources or [])])
+                return raw_value
+            except Exception as e:
+                raise ValueError(f"Failed to serialize field {name}={value}: {e}") from e
+
+        return serialize
 
     def format_sources(self) -> str:
         """
         Covert sources to bulletpoint list format as markdown links
         :return:
         """
+        return format_sources(self.sources)
 
-        def make_quote(source: models.SourceRef):
-            if source.quote:
-                quote = source.quote.strip(' \"\n*')
-                if source.page:
-                    return f"Page #{source.page}: {quote}"
-                return f"{quote}"
-            if source.page:
-                return f"(Page #{source.page})"
-            if source.type == models.SourceType.PITCH_DECK:
-                if source.page:
-                    return f"Page #{source.page}"
-                return "Pitch Deck"
-            parsed_url = urlparse(source.url)
-            return parsed_url.netloc
 
-        return '\n'.join([f"* [{make_quote(source)}]({source.url})" for source in self.sources if source.url])
+@dataclass(frozen=True)
+class AirFieldPlan:
+    """
+    Precompiled serialization of one writable field, used by `AirTable.serialize_fields`. The serializer comes from
+    `AirField.value_serializer`, built once per table, and never touches the shared schema field.
+    """
+    name: str
+    type: str
+    serializer: Callable[[Any, List[models.SourceRef]], Any]
+    readonly: bool
+
+    def serialize(self, value: Any, sources: List[models.SourceRef]) -> Any:
+        return self.serializer(value, sources)
 
 
 class AirTable(BaseModel):
@@ -83,6 +107,33 @@ class AirTable(BaseModel):
     def fields_by_name(self) -> Dict[str, 'AirField']:
         return {field.name: field for field in self.fields}
 
+    @cached_property
+    def field_plans(self) -> Dict[str, AirFieldPlan]:
+        return {
+            field.name: AirFieldPlan(
+                name=field.name,
+                type=field.type,
+                serializer=field.value_serializer(),
+                readonly=field.is_readonly(),
+            )
+            for field in self.fields
+        }
+
+    def serialize_fields(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Same fields as `set_data(data)` followed by `model_dump()['fields']` without None values,
+        in one pass over `data` and without touching the table state. Safe for tables shared between requests.
+        """
+        fields = {}
+        for name, v in data.items():
+            plan = self.field_plans.get(name)
+            if not plan or plan.readonly:
+                continue
+            raw_value = plan.serialize(v.get('value') or None, v.get('source') or [])
+            if raw_value is not None:
+                fields[name] = raw_value
+        return fields
+
     def set_data(self, data: Dict[str, Any]) -> 'AirTable':
         for k, v in data.items():
             field = self.fields_by_name.get(k)
@@ -134,34 +185,63 @@ class AirTableClient(object):
         Returns:
             A list of records.
         """
-        url = f"{self.base_url}/{self.base_id}/{table_id}"
-        all_records = []
-        params = {**kwargs, "pageSize": page_size}
+        return [
+            record async for record in self.iter_records(
+                table_id, page_size=page_size, max_records=max_records, resolve=resolve, **kwargs
+            )
+        ]
 
-        while True:
-            response = await self.http_client.get(url, headers=self.headers, params=params)
-            response.raise_for_status()
-            response_data = response.json()
+    async def iter_records(
+            self,
+            table_id: str,
+            page_size=RECORDS_PER_PAGE,
+            max_records=MAX_RECORDS_PER_REQUEST,
+            resolve: bool = False, **kwargs
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yields records from a table page by page. The next page is requested while the caller processes
+        the current one, so at most two pages are held in memory.
 
-            if "records" in response_data:
-                all_records.extend(response_data["records"])
+        Args:
+            table_id: The name of the table.
+            resolve: If True, replace IDs with human-readable values.
+            **kwargs: Additional query parameters.
 
-            # Check if we've reached the maximum number of records
-            if len(all_records) >= max_records:
-                all_records = all_records[:max_records]
-                break
+        Yields:
+            Records in the table order.
+        """
+        url = f"{self.base_url}/{self.base_id}/{table_id}"
+        params = {**kwargs, "pageSize": page_size}
+        resolver = None
 
-            # Check if there's an offset for the next page
-            if "offset" in response_data:
-                params["offset"] = response_data["offset"]
-            else:
-                # No more pages
-                break
+        async def fetch_page(offset: str | None) -> Dict[str, Any]:
+            page_params = {**params, "offset": offset} if offset else params
+            response = await self.http_client.get(url, headers=self.headers, params=page_params)
+            response.raise_for_status()
+            return response.json()
 
-        if resolve:
-            all_records = await self._resolve_record_ids(table_id, all_records)
-        
-        return all_records
+        yielded = 0
+        next_page = asyncio.create_task(fetch_page(None))
+        try:
+            while next_page is not None:
+                response_data = await next_page
+                next_page = None
+                records = response_data.get("records", [])[:max_records - yielded]
+                yielded += len(records)
+
+                # Prefetch the next page before handing out the current one
+                if "offset" in response_data and yielded < max_records:
+                    next_page = asyncio.create_task(fetch_page(response_data["offset"]))
+
+                if resolve and records:
+                    if resolver is None:
+                        resolver = await self._make_resolver(table_id)
+                    records = resolver(records)
+                for record in records:
+                    yield record
+        finally:
+            if next_page is not None:
+                next_page.cancel()
 
     async def get_record(self, table_id: str, record_id: str) -> Dict[str, Any]:
         """
@@ -213,6 +293,49 @@ class AirTableClient(object):
         response.raise_for_status()
         return response.json()
 
+    async def create_records(self, table_id: str, records: List[Dict[str, Any]], typecast=True) -> List[Dict[str, Any]]:
+        """
+        Creates records in batches of `RECORDS_PER_WRITE`.
+
+        Args:
+            table_id: The name of the table.
+            records: Fields of the new records.
+
+        Returns:
+            The created records in the same order.
+        """
+        url = f"{self.base_url}/{self.base_id}/{table_id}"
+        created = []
+        for chunk in _chunks(records, RECORDS_PER_WRITE):
+            data = {"records": [{"fields": fields} for fields in chunk], "typecast": typecast}
+            response = await self.http_client.post(url, headers=self.headers, json=data)
+            response.raise_for_status()
+            created.extend(response.json().get("records", []))
+        return created
+
+    async def update_records(self, table_id: str, records: List[Dict[str, Any]], typecast=True) -> List[Dict[str, Any]]:
+        """
+        Updates records in batches of `RECORDS_PER_WRITE`.
+
+        Args:
+            table_id: The name of the table.
+            records: Records with "id" and the updated "fields".
+
+        Returns:
+            The updated records in the same order.
+        """
+        url = f"{self.base_url}/{self.base_id}/{table_id}"
+        updated = []
+        for chunk in _chunks(records, RECORDS_PER_WRITE):
+            data = {
+                "records": [{"id": record["id"], "fields": record["fields"]} for record in chunk],
+                "typecast": typecast,
+            }
+            response = await self.http_client.patch(url, headers=self.headers, json=data)
+            response.raise_for_status()
+            updated.extend(response.json().get("records", []))
+        return updated
+
     async def get_base_data(self, **kwargs) -> Dict[str, AirTable]:
         """
         Gets the base schema.
@@ -230,8 +353,24 @@ class AirTableClient(object):
         tables = [AirTable(**table) for table in data["tables"]]
         return {table.id: table for table in tables}
 
+    async def _get_cached_schema(self) -> Dict[str, AirTable]:
+        """
+        Base schema shared by ID resolution across the process. Callers must not modify the returned tables.
+        """
+        cached = _schema_cache.get(self.base_id)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        tables = await self.get_base_data()
+        _schema_cache[self.base_id] = (time.monotonic() + RESOLVE_CACHE_TTL, tables)
+        return tables
+
     async def _fetch_linked_table_data(self, table_id: str, tables: Dict[str, AirTable]) -> Dict[str, str]:
-        """Fetch primary field values for a linked table."""
+        """Fetch primary field values for a linked table. Results are shared across the process."""
+        cache_key = (self.base_id, table_id)
+        cached = _lookup_cache.get(cache_key)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+
         target_table = tables.get(table_id)
         
         if not target_table:
@@ -246,16 +385,28 @@ class AirTableClient(object):
         if not primary_field:
             return {}
         
-        records = await self.list_records(target_table.name, **{'fields[]': primary_field})
-        return {rec['id']: rec['fields'].get(primary_field) for rec in records if rec['fields'].get(primary_field)}
-
-    def _resolve_field_value(self, field: AirField, value: Any, linked_table_cache: Dict[str, Dict[str, str]]) -> Any:
+        lookup = {
+            rec['id']: rec['fields'].get(primary_field)
+            async for rec in self.iter_records(target_table.name, **{'fields[]': primary_field})
+            if rec['fields'].get(primary_field)
+        }
+        _lookup_cache[cache_key] = (time.monotonic() + RESOLVE_CACHE_TTL, lookup)
+        return lookup
+
+    def _resolve_field_value(
+            self,
+            field: AirField,
+            value: Any,
+            linked_table_cache: Dict[str, Dict[str, str]],
+            options: Dict[str, str] = None,
+    ) -> Any:
         """Resolve field value based on field type, similar to dashboard's convert_filed."""
         if value is None:
             return value
         
         field_type = field.type
-        options = {opt['id']: opt['name'] for opt in (field.options or {}).get('choices', [])}
+        if options is None:
+            options = _choice_names(field)
         
         if field_type == 'singleSelect':
             if isinstance(value, list) and len(value) == 1:
@@ -280,40 +431,74 @@ class AirTableClient(object):
         
         return value
 
-    async def _resolve_record_ids(self, table_id: str, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Resolve IDs to human-readable values in record fields."""
-        if not records:
-            return records
-        
+    async def _make_resolver(self, table_id: str) -> Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]:
+        """Load the table schema and linked tables once, return a function resolving IDs in a batch of records."""
         # Get table schema
-        tables = await self.get_base_data()
+        tables = await self._get_cached_schema()
         target_table = tables.get(table_id)
-        
+
         if not target_table:
+            return lambda records: records
+
+        # Fetch linked tables concurrently
+        linked_table_ids = list(dict.fromkeys(
+            field.options.get('linkedTableId')
+            for field in target_table.fields
+            if field.type == 'multipleRecordLinks' and field.options and field.options.get('linkedTableId')
+        ))
+        lookups = await asyncio.gather(*[
+            self._fetch_linked_table_data(linked_table_id, tables) for linked_table_id in linked_table_ids
+        ])
+        linked_table_cache = dict(zip(linked_table_ids, lookups))
+        field_options = {field.name: _choice_names(field) for field in target_table.fields}
+
+        def resolve(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            # Resolve fields in each record
+            for record in records:
+                record_fields = record.get('fields', {})
+
+                for field in target_table.fields:
+                    field_name = field.name
+                    if field_name in record_fields:
+                        field_value = record_fields[field_name]
+                        resolved_value = self._resolve_field_value(
+                            field, field_value, linked_table_cache, field_options[field_name]
+                        )
+                        record_fields[field_name] = resolved_value
             return records
-        
-        # Build cache for linked tables
-        linked_table_cache = {}
-        for field in target_table.fields:
-            if field.type == 'multipleRecordLinks':
-                linked_table_id = field.options.get('linkedTableId') if field.options else None
-                if linked_table_id and linked_table_id not in linked_table_cache:
-                    linked_table_cache[linked_table_id] = await self._fetch_linked_table_data(linked_table_id, tables)
-        
-        # Resolve fields in each record
-        for record in records:
-            record_fields = record.get('fields', {})
-            
-            for field in target_table.fields:
-                field_name = field.name
-                if field_name in record_fields:
-                    field_value = record_fields[field_name]
-                    resolved_value = self._resolve_field_value(
-                        field, field_value, linked_table_cache
-                    )
-                    record_fields[field_name] = resolved_value
-        
-        return records
+
+        return resolve
+
+
+def format_sources(sources: List[models.SourceRef]) -> str:
+    """
+    Covert sources to bulletpoint list format as markdown links
+    """
+
+    def make_quote(source: models.SourceRef):
+        if source.quote:
+            quote = source.quote.strip(' \"\n*')
+            if source.page:
+                return f"Page #{source.page}: {quote}"
+            return f"{quote}"
+        if source.page:
+            return f"(Page #{source.page})"
+        if source.type == models.SourceType.PITCH_DECK:
+            if source.page:
+                return f"Page #{source.page}"
+            return "Pitch Deck"
+        parsed_url = urlparse(source.url)
+        return parsed_url.netloc
+
+    return '\n'.join([f"* [{make_quote(source)}]({source.url})" for source in sources if source.url])
+
+
+def _chunks(items: List[Any], size: int) -> List[List[Any]]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _choice_names(field: AirField) -> Dict[str, str]:
+    return {opt['id']: opt['name'] for opt in (field.options or {}).get('choices', [])}
 
 
 _readonly_field_types = {
@@ -1,43 +1,58 @@
 import re
 from fastapi import Depends, Query, Body, Request
 from google.cloud import firestore
-from app.foundation.server.dependencies import get_logger, get_http_client, get_firestore_client, get_dataset_bucket
+from app.foundation import pattern
+from app.foundation.server.dependencies import get_logger, get_http_client, get_firestore_client, get_dataset_bucket, get_config
 
 from .spectr_client import SpectrClient
 from .scrapin_client import ScrapinClient
 from .serpapi_client import SerpApiClient
 
 
+def upstream_rate_limiter(config, name: str, defaults: dict) -> pattern.RateLimiter:
+    """
+    Process-wide rate limiter for the upstream. `rate_limits.<name>` in config overrides client defaults.
+    """
+    overrides = config.get('rate_limits', {}).get(name) or {}
+    return pattern.rate_limiter(name, **(defaults | dict(overrides)))
+
+
 async def get_scrapin_clinet(
     logger = Depends(get_logger),
     http_client = Depends(get_http_client),
+    config = Depends(get_config),
 ) -> ScrapinClient:
 
     return ScrapinClient(
         logger=logger,
-        http_client=http_client
+        http_client=http_client,
+        rate_limiter=upstream_rate_limiter(config, "scrapin", ScrapinClient.RATE_LIMIT),
     )
 
 
 async def get_spectr_client(
     logger = Depends(get_logger),
     http_client = Depends(get_http_client),
-    dataset_bucket = Depends(get_dataset_bucket)
+    dataset_bucket = Depends(get_dataset_bucket),
+    config = Depends(get_config),
 ) -> SpectrClient:
     return SpectrClient(
         logger=logger,
         http_client=http_client,
-        dataset_bucket=dataset_bucket
+        dataset_bucket=dataset_bucket,
+        rate_limiter=upstream_rate_limiter(config, "spectr", SpectrClient.RATE_LIMIT),
     )
 
 
 async def get_serpapi_client(
     logger = Depends(get_logger),
     http_client = Depends(get_http_client),
+    config = Depends(get_config),
 ) -> SerpApiClient:
     return SerpApiClient(
         logger=logger,
-        http_client=http_client
+        http_client=http_client,
+        rate_limiter=upstream_rate_limiter(config, "serpapi", SerpApiClient.RATE_LIMIT),
     )
 
 
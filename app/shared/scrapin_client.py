@@ -3,6 +3,7 @@ from pydantic import BaseModel
 from typing import Dict
 
 from app.foundation import get_env
+from app.foundation import pattern
 from app.foundation.server.logger import Logger
 
 
@@ -11,15 +12,18 @@ __all__ = ['ScrapinClient']
 
 class ScrapinClient(object):
     BASE_URL = "https://api.scrapin.io"
+    RATE_LIMIT = {"rate": 5, "capacity": 10, "concurrency": 4}
 
     def __init__(
         self,
         logger: Logger,
         http_client: httpx.AsyncClient,
+        rate_limiter: pattern.RateLimiter = None,
     ):
         self._api_key = str(get_env("SCRAPIN_API_KEY")).strip()
         self._http_client = http_client
         self._logger = logger
+        self._rate_limiter = rate_limiter or pattern.rate_limiter("scrapin", **self.RATE_LIMIT)
 
     async def request(self, method: str, endpoint: str, **kwargs) -> dict:
         url = f"{self.BASE_URL}{endpoint}"
@@ -32,7 +36,9 @@ class ScrapinClient(object):
             "params": {k: v for k, v in params.items() if k != 'apikey'}
         })
         
-        response = await self._http_client.request(method=method, url=url, **kwargs)
+        async with self._rate_limiter:
+            response = await self._http_client.request(method=method, url=url, **kwargs)
+        self._rate_limiter.update_from_headers(response.headers, response.status_code)
         if response.status_code == httpx.codes.NOT_FOUND:
             return {}
         response.raise_for_status()
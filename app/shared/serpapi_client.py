@@ -1,7 +1,10 @@
+import asyncio
+import inspect
 import httpx
-from typing import Dict
+from typing import Awaitable, Callable, Dict, List
 
 from app.foundation import get_env
+from app.foundation import pattern
 from app.foundation.server.logger import Logger
 
 
@@ -10,15 +13,18 @@ __all__ = ['SerpApiClient']
 
 class SerpApiClient(object):
     BASE_URL = "https://serpapi.com"
+    RATE_LIMIT = {"rate": 5, "capacity": 10, "concurrency": 8}
 
     def __init__(
         self,
         logger: Logger,
         http_client: httpx.AsyncClient,
+        rate_limiter: pattern.RateLimiter = None,
     ):
         self._api_key = str(get_env("SERPAPI_API_KEY")).strip()
         self._http_client = http_client
         self._logger = logger
+        self._rate_limiter = rate_limiter or pattern.rate_limiter("serpapi", **self.RATE_LIMIT)
 
     async def request(self, method: str, engine: str, **kwargs) -> dict:
         url = f"{self.BASE_URL}/search"
@@ -32,7 +38,9 @@ class SerpApiClient(object):
             "params": {k: v for k, v in params.items() if k != 'api_key'}
         })
         
-        response = await self._http_client.request(method=method, url=url, **kwargs)
+        async with self._rate_limiter:
+            response = await self._http_client.request(method=method, url=url, **kwargs)
+        self._rate_limiter.update_from_headers(response.headers, response.status_code)
         if response.status_code == httpx.codes.NOT_FOUND:
             return {}
         response.raise_for_status()
@@ -69,29 +77,82 @@ class SerpApiClient(object):
         data = await self.request("GET", "apple_product", params=params)
         return data
 
-    async def search_google_jobs(self, q: str, amount=None, **kwargs) -> Dict:
+    async def search_google_jobs(
+            self,
+            q: str,
+            amount=None,
+            max_pages=None,
+            page_filter: Callable[[List[Dict]], List[Dict] | Awaitable[List[Dict]]] = None,
+            **kwargs
+    ) -> Dict:
+        """
+        Search Google Jobs and follow `next_page_token`.
+
+        :param amount: stop once this many jobs are collected
+        :param max_pages: stop after this many pages
+        :param page_filter: returns relevant jobs of a page, sync or async. Paging stops at the first page without
+            relevant jobs. The request for the next page is already sent while the filter runs.
+        :return: merged response with `search_stats` holding pages used, credits spent and whether paging
+            reached the last page of the results
+        """
         if amount is None:
             amount = float('inf')
+        if max_pages is None:
+            max_pages = float('inf')
 
         params = {
             "q": q
         }
         params.update(kwargs)
 
-        # Get first page
-        data = await self.request("GET", "google_jobs", params=params)
-        last_response = data
-        # Fetch additional pages if needed
-        while len(data.get("jobs_results", [])) < amount:
-            serpapi_pagination = last_response.get("serpapi_pagination") or {}
-            next_page_token = serpapi_pagination.get("next_page_token")
-            if not next_page_token:
-                break
-
-            params["next_page_token"] = next_page_token
-            last_response = await self.request("GET", "google_jobs", params=params)
+        credits = 0
 
-            if "jobs_results" in last_response:
-                data["jobs_results"].extend(last_response["jobs_results"])
+        async def _fetch_page(next_page_token: str = None) -> Dict:
+            nonlocal credits
+            credits += 1
+            page_params = dict(params)
+            if next_page_token:
+                page_params["next_page_token"] = next_page_token
+            return await self.request("GET", "google_jobs", params=page_params)
 
+        # Get first page
+        data = await _fetch_page()
+        if not data:
+            return data
+        data.setdefault("jobs_results", [])
+        last_response = data
+        pages = 1
+        complete = False
+        next_page_task = None
+        try:
+            while True:
+                serpapi_pagination = last_response.get("serpapi_pagination") or {}
+                next_page_token = serpapi_pagination.get("next_page_token")
+                if next_page_token and pages < max_pages and len(data["jobs_results"]) < amount:
+                    next_page_task = asyncio.create_task(_fetch_page(next_page_token))
+                    # Let the task send its request before the filter runs
+                    await asyncio.sleep(0)
+
+                if page_filter is not None:
+                    relevant_jobs = page_filter(last_response.get("jobs_results") or [])
+                    if inspect.isawaitable(relevant_jobs):
+                        relevant_jobs = await relevant_jobs
+                    if not relevant_jobs:
+                        # Later pages may still hold stored postings, so an early stop is not a full listing
+                        complete = not next_page_token
+                        break
+                if next_page_task is None:
+                    complete = not next_page_token
+                    break
+
+                last_response = await next_page_task
+                next_page_task = None
+                pages += 1
+                if "jobs_results" in last_response:
+                    data["jobs_results"].extend(last_response["jobs_results"])
+        finally:
+            if next_page_task is not None:
+                next_page_task.cancel()
+
+        data["search_stats"] = {"pages": pages, "credits": credits, "complete": complete}
         return data
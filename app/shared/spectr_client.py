@@ -1,6 +1,7 @@
 import httpx
 from google.cloud import storage
 from app.foundation import get_env, as_async
+from app.foundation import pattern
 from app.foundation.server.logger import Logger
 from typing import Dict, Any, List
 
@@ -9,25 +10,30 @@ __all__ = ["SpectrClient"]
 
 
 class SpectrClient(object):
+    RATE_LIMIT = {"rate": 5, "capacity": 10, "concurrency": 4}
 
     def __init__(
             self,
             logger: Logger,
             http_client: httpx.AsyncClient,
             dataset_bucket: storage.Bucket = None,
+            rate_limiter: pattern.RateLimiter = None,
     ):
         self._api_key = str(get_env("SPECTR_API_KEY")).strip()
         self._http_client = http_client
         self._logger = logger
         self._base_url = "https://app.tryspecter.com/api/v1"
         self._dataset_bucket = dataset_bucket
+        self._rate_limiter = rate_limiter or pattern.rate_limiter("spectr", **self.RATE_LIMIT)
 
     async def request(self, method: str, endpoint: str, **kwargs) -> Dict[str, Any]:
         url = f"{self._base_url}/{endpoint}"
         headers = {"X-API-KEY": self._api_key, "accept": "application/json"}
         kwargs["headers"] = {**headers, **kwargs.get("headers", {})}
 
-        response = await self._http_client.request(method=method, url=url, **kwargs)
+        async with self._rate_limiter:
+            response = await self._http_client.request(method=method, url=url, **kwargs)
+        self._rate_limiter.update_from_headers(response.headers, response.status_code)
 
         # Process rate limits and credit limits
         rate_limit = {
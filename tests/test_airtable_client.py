@@ -0,0 +1,64 @@
+import pytest
+
+pytest.importorskip("pydantic")
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from app.shared import models
+from app.shared.airtable_client import AirTable, AirField
+
+
+def _table(*fields: AirField) -> AirTable:
+    return AirTable(id="tbl1", name="Companies", primaryFieldId=fields[0].id, fields=list(fields), views=[])
+
+
+def test_field_plan_matches_field_dump():
+    sources = [models.SourceRef(url="https://example.com/deck.pdf", page=3, quote="Revenue grew")]
+    table = _table(
+        AirField(id="fld1", type="singleLineText", name="Name"),
+        AirField(id="fld2", type="richText", name="Summary"),
+        AirField(id="fld3", type="number", name="Revenue"),
+    )
+    data = {
+        "Name": {"value": "Acme"},
+        "Summary": {"value": "Sells anvils", "source": sources},
+        "Revenue": {"value": "1200"},
+    }
+
+    expected = table.model_copy(deep=True).set_data(data).model_dump()["fields"]
+    assert table.serialize_fields(data) == {name: value for name, value in expected.items() if value is not None}
+    assert "example.com/deck.pdf" in table.serialize_fields(data)["Summary"]
+
+
+def test_serialize_fields_skips_readonly_unknown_and_empty_fields():
+    table = _table(
+        AirField(id="fld1", type="singleLineText", name="Name"),
+        AirField(id="fld2", type="formula", name="Score"),
+        AirField(id="fld3", type="singleLineText", name="Lookup", options={"fieldIdInLinkedTable": "fld9"}),
+    )
+
+    fields = table.serialize_fields({
+        "Name": {"value": None},
+        "Score": {"value": "10"},
+        "Lookup": {"value": "x"},
+        "Missing": {"value": "y"},
+    })
+
+    assert fields == {}
+
+
+def test_field_plan_does_not_mutate_the_schema_field():
+    field = AirField(id="fld1", type="singleLineText", name="Name")
+    table = _table(field)
+
+    table.serialize_fields({"Name": {"value": "Acme"}})
+
+    assert field.value is None
+
+
+def test_field_plan_without_serializer():
+    plan = _table(AirField(id="fld1", type="unknownType", name="Name")).field_plans["Name"]
+
+    assert plan.serialize(None, []) is None
+    with pytest.raises(ValueError):
+        plan.serialize("Acme", [])
@@ -0,0 +1,63 @@
+import pytest
+
+pytest.importorskip("pydantic")
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+pytest.importorskip("yaml")
+
+from app.foundation.server.logger import LocalLogger
+from app.integrations.airtable.sync_action import AirSyncAction, _Workspace
+
+
+def _action() -> AirSyncAction:
+    return AirSyncAction(airtable_client=None, deal_table_id="tbl1", people_table_id="tbl2", logger=LocalLogger())
+
+
+def test_compile_mapping_keeps_order_and_skips_fields_without_airtable_field():
+    plans = _action()._compile_mapping({
+        "startup_table": {
+            "name": {"airtable_field": "Company"},
+            "notes": {},
+            "stage": {"airtable_field": "Status", "value": "New Company"},
+        },
+        "people_table": None,
+    })
+
+    assert plans == {
+        "startup_table": [("name", "Company", None), ("stage", "Status", "New Company")],
+        "people_table": [],
+    }
+
+
+def test_compile_mapping_of_empty_schema():
+    assert _action()._compile_mapping(None) == {}
+    assert _action()._compile_mapping({}) == {}
+
+
+def test_apply_mapping_uses_compiled_plan():
+    action = _action()
+    action._workspace = _Workspace(
+        tables={},
+        mapping_plans=action._compile_mapping({
+            "startup_table": {
+                "name": {"airtable_field": "Company"},
+                "stage": {"airtable_field": "Status", "value": "New Company"},
+                "website": {"airtable_field": "URL"},
+            },
+        }),
+        mapping_mtime=None,
+        expires_at=0,
+    )
+
+    result = action._apply_mapping({
+        "name": {"value": "Acme"},
+        "website": {"value": None},
+        "blurb": {"value": "Anvils"},
+    }, "startup_table")
+
+    assert result == {
+        "Company": {"value": "Acme"},
+        "Status": {"value": "New Company"},
+        "URL": {"value": None},
+        "blurb": {"value": "Anvils"},
+    }
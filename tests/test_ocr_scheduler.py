@@ -0,0 +1,33 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("openai")
+pytest.importorskip("fastapi")
+
+from app.companies.pdf.ocr_scheduler import OcrScheduler
+
+
+async def _noop():
+    return None
+
+
+def test_decks_take_turns_under_a_tight_budget():
+    # 10 tokens per second, each call waits 0.1s for its token once the bucket is drained
+    scheduler = OcrScheduler(concurrency=4, tokens_per_minute=600)
+    order = []
+
+    async def call(deck_id: str):
+        async def fn():
+            order.append(deck_id)
+        await scheduler.call(deck_id, 1, fn)
+
+    async def run():
+        await scheduler.call("warmup", 600, _noop)
+        await asyncio.gather(*[call("A") for _ in range(6)], *[call("B") for _ in range(3)])
+
+    asyncio.run(run())
+
+    # The first call of A is picked before B queues, from then on the decks alternate
+    assert order == ["A", "A", "B", "A", "B", "A", "B", "A", "A"]
+    assert scheduler._active == 0
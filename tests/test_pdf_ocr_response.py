@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+pytest.importorskip("fitz")
+pytest.importorskip("openai")
+pytest.importorskip("fastapi")
+
+from app.companies.pdf.flyweight import _parse_ocr_response, _partial_markdown
+
+MARKDOWN = '# Revenue\n"ARR" grew to $1.2M é \\ 2024'
+ANSWER = json.dumps({"markdown": MARKDOWN, "complete": True, "missing": ""})
+
+
+def test_structured_answer():
+    assert _parse_ocr_response(ANSWER) == {"markdown": MARKDOWN, "complete": True, "missing": ""}
+
+
+@pytest.mark.parametrize("length", range(len('{"markdown": "'), len(ANSWER)))
+def test_truncated_answer_keeps_a_prefix_of_the_markdown(length):
+    result = _parse_ocr_response(ANSWER[:length])
+
+    assert not result["complete"]
+    assert result["missing"] == "truncated response"
+    assert MARKDOWN.startswith(result["markdown"])
+
+
+def test_truncated_answer_never_returns_json():
+    for length in range(1, len('{"markdown": "')):
+        result = _parse_ocr_response(ANSWER[:length])
+        assert result == {"markdown": "", "complete": False, "missing": "unparsable response"}
+
+
+def test_unstructured_answer_is_kept_as_incomplete_text():
+    assert _parse_ocr_response("Plain slide text") == {
+        "markdown": "Plain slide text", "complete": False, "missing": "unstructured response",
+    }
+    assert _parse_ocr_response(None)["markdown"] == ""
+
+
+def test_partial_markdown_drops_incomplete_escapes():
+    assert _partial_markdown('{"markdown": "abc\\u00') == "abc"
+    assert _partial_markdown('{"markdown": "abc\\') == "abc"
+    assert _partial_markdown('{"complete": false') is None
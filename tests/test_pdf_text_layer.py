@@ -0,0 +1,54 @@
+import pytest
+
+fitz = pytest.importorskip("fitz")
+pytest.importorskip("openai")
+pytest.importorskip("fastapi")
+
+from app.companies.pdf.flyweight import _text_layer
+
+TEXT = " ".join(["Acme sells anvils to coyotes across the desert."] * 8)
+TEXT_RECT = fitz.Rect(60, 60, 340, 300)
+
+
+def _page(*image_rects: fitz.Rect) -> fitz.Page:
+    document = fitz.open()
+    page = document.new_page()
+    pixmap = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 8, 8), False)
+    pixmap.set_rect(pixmap.irect, (200, 40, 40))
+    for image_rect in image_rects:
+        page.insert_image(image_rect, pixmap=pixmap)
+    assert page.insert_textbox(TEXT_RECT, TEXT, fontsize=11) >= 0
+    return page
+
+
+def test_text_only_page():
+    text, coverage = _text_layer(_page())
+
+    assert "Acme sells anvils" in text
+    assert coverage == 1.0
+
+
+def test_full_page_background_does_not_lower_the_score():
+    page = _page(fitz.Rect(0, 0, 595, 842))
+
+    assert _text_layer(page)[1] == 1.0
+
+
+def test_small_image_behind_text_lowers_the_score():
+    image_rect = fitz.Rect(50, 50, 350, 400)
+    page = _page(image_rect)
+
+    _, coverage = _text_layer(page)
+
+    assert coverage == pytest.approx(1 - image_rect.get_area() / page.rect.get_area())
+
+
+def test_short_text_scores_low():
+    document = fitz.open()
+    page = document.new_page()
+    page.insert_text((72, 72), "Thank you")
+
+    text, coverage = _text_layer(page)
+
+    assert text == "Thank you"
+    assert coverage < 0.1